@@ -16,6 +16,7 @@ load_dotenv()
 FLARE_RPC_URL = os.getenv("FLARE_RPC_URL")
 ETH_RPC_URL = os.getenv("ETH_RPC_URL")
 ETHERSCAN_API_KEY = os.getenv("ETHERSCAN_API_KEY")
+INGEST_URL = os.getenv("INGEST_URL")  # e.g. http://localhost:5000/ingest to persist the collected ticks
 
 # Initialize Web3 clients
 web3_flare = Web3(Web3.HTTPProvider(FLARE_RPC_URL))
@@ -47,6 +48,11 @@ ABI = json.loads('''[
         {"internalType":"uint256","name":"","type":"uint256"},
         {"internalType":"int8","name":"","type":"int8"},
         {"internalType":"uint64","name":"","type":"uint64"}
+    ],"stateMutability":"payable","type":"function"},
+    {"inputs":[{"internalType":"bytes21[]","name":"_feedIds","type":"bytes21[]"}],"name":"getFeedsById","outputs":[
+        {"internalType":"uint256[]","name":"_values","type":"uint256[]"},
+        {"internalType":"int8[]","name":"_decimals","type":"int8[]"},
+        {"internalType":"uint64","name":"_timestamp","type":"uint64"}
     ],"stateMutability":"payable","type":"function"}
 ]''')
 
@@ -64,16 +70,19 @@ async def get_ftso_prices() -> dict:
 
     ftsov2 = w3.eth.contract(address=w3.to_checksum_address(FTSOV2_ADDRESS), abi=ABI)
 
+    # Read every feed in a single eth_call instead of one round trip per symbol
     prices = {}
-    for symbol, feed_id in FEED_IDS.items():
-        try:
-            feeds, decimals, timestamp = await ftsov2.functions.getFeedById(feed_id).call()
-            real_price = feeds / (10 ** decimals)
-            human_time = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S UTC')
-            prices[symbol] = {"price": real_price, "timestamp": human_time}
-            print(f"[FTSO] {symbol}: {real_price} USD (Updated: {human_time})")
-        except Exception as e:
-            print(f"[ERROR] FTSO fetch failed for {symbol}: {e}")
+    try:
+        values, decimals, timestamp = await ftsov2.functions.getFeedsById(list(FEED_IDS.values())).call()
+    except Exception as e:
+        print(f"[ERROR] FTSO batch fetch failed: {e}")
+        return prices
+
+    human_time = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S UTC')
+    for symbol, value, decimal in zip(FEED_IDS.keys(), values, decimals):
+        real_price = value / (10 ** decimal)
+        prices[symbol] = {"price": real_price, "timestamp": human_time, "unix_timestamp": timestamp}
+        print(f"[FTSO] {symbol}: {real_price} USD (Updated: {human_time})")
 
     return prices
 
@@ -189,7 +198,25 @@ def get_pool_liquidity(pool_address: str, abi: list):
         return None
 
 # -----------------------------
-# 5️⃣ Run All Data Collection Steps
+# 5️⃣ Persist Ticks to the Backend
+# -----------------------------
+
+def post_ticks(ticks: list):
+    """Sends the collected ticks to the backend's write-behind ingest endpoint in one request."""
+    if not INGEST_URL or not ticks:
+        return
+    try:
+        response = requests.post(INGEST_URL, json={"ticks": ticks}, timeout=10)
+        response.raise_for_status()
+        result = response.json()
+        print(f"[Ingest] Queued {result.get('queued', 0)} of {len(ticks)} ticks")
+        for rejected in result.get("rejected", []):
+            print(f"[Ingest] Rejected {ticks[rejected['index']]['symbol']}: {rejected['message']}")
+    except Exception as e:
+        print(f"[ERROR] Failed to post ticks to {INGEST_URL}: {e}")
+
+# -----------------------------
+# 6️⃣ Run All Data Collection Steps
 # -----------------------------
 
 async def main():
@@ -199,6 +226,7 @@ async def main():
     ftso_prices = await get_ftso_prices()
 
     # Fetch Pool Addresses
+    ticks = []
     for pair in FEED_IDS.keys():
         token0, token1 = pair.split("/")  # Extract tokens correctly
 
@@ -235,6 +263,17 @@ async def main():
         print(f"Curve Pool: {curve_pool}, Liquidity: {curve_liquidity}")
         print("---------------------------------------------------")
 
+        if pair in ftso_prices:
+            ticks.append({
+                "symbol": pair.split("/")[0],
+                "price": ftso_prices[pair]["price"],
+                "timestamp": ftso_prices[pair]["unix_timestamp"],
+                "uniswap_liquidity": uniswap_liquidity,
+                "curve_liquidity": curve_liquidity,
+            })
+
+    post_ticks(ticks)
+
 
 if __name__ == "__main__":
     asyncio.run(main())
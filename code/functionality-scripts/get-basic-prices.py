@@ -50,6 +50,11 @@ ABI_JSON_STRING = '''[
         {"internalType":"uint256","name":"","type":"uint256"},
         {"internalType":"int8","name":"","type":"int8"},
         {"internalType":"uint64","name":"","type":"uint64"}
+    ],"stateMutability":"payable","type":"function"},
+    {"inputs":[{"internalType":"bytes21[]","name":"_feedIds","type":"bytes21[]"}],"name":"getFeedsById","outputs":[
+        {"internalType":"uint256[]","name":"_values","type":"uint256[]"},
+        {"internalType":"int8[]","name":"_decimals","type":"int8[]"},
+        {"internalType":"uint64","name":"_timestamp","type":"uint64"}
     ],"stateMutability":"payable","type":"function"}
 ]'''
 
@@ -73,17 +78,18 @@ async def main() -> Tuple[List[int], List[int], int]:
     # Set up contract instance (with valid ABI)
     ftsov2 = w3.eth.contract(address=w3.to_checksum_address(FTSOV2_ADDRESS), abi=ABI)
 
-    # Fetch current feeds
-    for feed_id in FEED_IDS:
-        feeds, decimals, timestamp = await ftsov2.functions.getFeedById(feed_id).call()
+    # Fetch current feeds in a single call
+    feed_ids = list(FEED_IDS.values())
+    values, decimals, timestamp = await ftsov2.functions.getFeedsById(feed_ids).call()
 
+    for feed_id, feed, decimal in zip(feed_ids, values, decimals):
         # Print results
         print("Feed ID:", feed_id)
-        print("Feeds:", feeds)
-        print("Decimals:", decimals)
+        print("Feeds:", feed)
+        print("Decimals:", decimal)
         print("Timestamp:", timestamp)
 
-        data = feeds, decimals, timestamp
+        data = feed, decimal, timestamp
         process_feed_data(*data)
         print("-------")
 
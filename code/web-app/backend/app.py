@@ -1,14 +1,20 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, json as flask_json, jsonify, request, stream_with_context
 from flask_cors import CORS  # Import Flask-CORS
-import mysql.connector
-import pymysql
 import os
-import subprocess
 import json
-import csv
-import time
+import queue
 import logging
+import db
+import columnar
+import ingest
+import migrations
 import qaoa_arbitrage_test as qaoa_arbitrage
+from ftso_price_service import FtsoPriceService
+from ftso_poller import FtsoPoller
+from jobs import JobManager
+from ingest_writer import BatchWriter
+from history_queries import build_history_sql, fetch_history, parse_history_args
+from price_matrix import build_price_matrix
 #import qaoa_arbitrage
 
 app = Flask(__name__)
@@ -18,162 +24,331 @@ CORS(app)  # Enable CORS for all routes
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
-# Database connection
-db_config = {
-    "host": os.getenv("DB_HOST", "mysql"),
-    "user": os.getenv("DB_USER", "myuser"),
-    "password": os.getenv("DB_PASSWORD", "mypassword"),
-    "database": os.getenv("DB_NAME", "mydatabase"),
-}
-
-def get_db_connection():
-    retries = 5
-    while retries > 0:
-        try:
-            conn = mysql.connector.connect(**db_config)
-            return conn
-        except mysql.connector.Error as err:
-            print(f"Database connection failed: {err}")
-            retries -= 1
-            time.sleep(5)  # Wait before retrying
-    raise Exception("Could not connect to the database after multiple attempts")
-
-
-conn = get_db_connection()
-
-
-def create_table():
-    """Creates a table for storing live market data if it does not already exist."""
-    cur = conn.cursor()
-    cur.execute("""
-        CREATE TABLE IF NOT EXISTS market_data (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            symbol VARCHAR(10) NOT NULL,
-            price DECIMAL(18,8) NOT NULL,
-            uniswap_liquidity DECIMAL(30,8),
-            curve_liquidity DECIMAL(30,8),
-            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-    conn.commit()
-    cur.close()
-    logger.info("Database table `market_data` checked/created.")
-
-create_table()  # Ensure table is created on startup
-
 def import_csv_to_db():
-    """Imports CSV data into MySQL."""
-    cur = conn.cursor()
-
-    with open("historical_data.csv", "r") as file:
-        reader = csv.reader(file)
-        headers = next(reader)  # Extract headers
-
-        for row in reader:
-            date = row[0]
-            for i in range(1, len(headers)):  # Skip the date column
-                symbol = headers[i]
-                price = float(row[i]) if row[i] else 0  # Handle empty values
-                cur.execute("""
-                    INSERT INTO market_data (symbol, price, timestamp)
-                    VALUES (%s, %s, %s)
-                """, (symbol, price, date))
-
-    conn.commit()
-    cur.close()
-    logger.info("CSV data successfully imported into MySQL.")
+    """Bulk-imports historical_data.csv into MySQL (idempotent, see ingest.import_csv)."""
+    ingest.import_csv("historical_data.csv")
 
 #import_csv_to_db()  # Import CSV data on startup
 
+price_service = FtsoPriceService()
+ftso_poller = FtsoPoller()
+ftso_poller.add_listener(price_service.store)  # Every poll also refreshes the request/response cache
+
+# Live ticks (polled FTSO prices and POST /ingest) are persisted through one write-behind batch writer
+PERSIST_FTSO_PRICES = os.getenv("PERSIST_FTSO_PRICES", "1") == "1"
+ingest_writer = BatchWriter()
+_persisted_feed_timestamps = {}
+
+def persist_feeds(feeds):
+    """Poller listener: queues feeds that moved since the last poll. Runs on the event loop, so never blocks."""
+    for symbol, feed_id, value, decimals, timestamp in feeds:
+        if _persisted_feed_timestamps.get(symbol) == timestamp:
+            continue
+        try:
+            ingest_writer.put(ingest.feed_row(symbol, value, decimals, timestamp), timeout=0)
+        except queue.Full:
+            logger.warning("Ingest queue is full; polled FTSO prices will be retried on the next poll.")
+            return
+        # Only marked once queued, so a dropped feed is persisted by a later poll
+        _persisted_feed_timestamps[symbol] = timestamp
+
+def start_background_services():
+    """
+    Startup work for the serving process only: schema migrations, then the FTSO poller feeding the
+    ingest writer. Kept out of module scope because spawned job workers re-import the main module.
+    """
+    migrations.migrate()  # Bring the database schema up to date on startup
+    if PERSIST_FTSO_PRICES:
+        ftso_poller.add_listener(persist_feeds)
+        ftso_poller.start()
+
+SSE_KEEPALIVE_SECONDS = 15
+MATRIX_MAX_SYMBOLS = 50
+
+qaoa_jobs = JobManager(qaoa_arbitrage.execute_trades)
+
 
 @app.route("/ftso-live-prices", methods=["POST"])
 def fetch_ftso_live_prices():
     """
-    Calls an external Python script (`fetch_ftso_live_prices.py`) to get live FTSO prices.
+    Returns live FTSO prices from the in-process price service.
+    Feeds already read in the current voting epoch are served from cache.
     """
     try:
         symbols = request.json.get("symbols", [])
         symbols = [s[:-4] if isinstance(s, str) and s.endswith("USDT") else s for s in symbols]
         logging.info(f"Symbols: {symbols}")
-        result = subprocess.run(["python", "fetch_ftso_live_prices.py", json.dumps(symbols)], capture_output=True, text=True)
 
-        if result.returncode != 0:
-            return jsonify({"status": "error", "message": result.stderr}), 500
+        return jsonify({"status": "success", "data": price_service.get_prices(symbols)})
+
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/ftso-stream")
+def stream_ftso_live_prices():
+    """
+    Server-Sent Events stream of live FTSO prices, fed by the background poller.
+    Sends the current prices on connect, then only the feeds that changed after each epoch.
+    Optional `?symbols=BTC,ETH` restricts the stream to those feeds.
+    """
+    symbols = {s[:-4] if s.endswith("USDT") else s for s in request.args.get("symbols", "").split(",") if s}
 
-        return jsonify({"status": "success", "data": result.stdout})
+    def wanted(feeds):
+        return [feed for feed in feeds if not symbols or feed["symbol"] in symbols]
+
+    def events():
+        updates, snapshot = ftso_poller.subscribe()
+        try:
+            initial = wanted(snapshot.values())
+            if initial:
+                yield f"data: {json.dumps({'feeds': initial})}\n\n"
+
+            while True:
+                try:
+                    changed = wanted(updates.get(timeout=SSE_KEEPALIVE_SECONDS))
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                if changed:
+                    yield f"data: {json.dumps({'feeds': changed})}\n\n"
+        finally:
+            ftso_poller.unsubscribe(updates)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/ingest", methods=["POST"])
+def ingest_ticks():
+    """
+    Queues live ticks (`{"ticks": [{"symbol", "price", "timestamp"?, "uniswap_liquidity"?, "curve_liquidity"?}]}`)
+    for the batch writer and returns 202 without waiting for the database.
+    Invalid ticks are skipped and listed under `rejected` (by index); only a body with no valid ticks is a 400.
+    Returns 503 when the writer has fallen behind (queueing none of the ticks), so producers back off and retry.
+    """
+    body = request.get_json(silent=True)
+    ticks = body.get("ticks", []) if isinstance(body, dict) else None
+    if not isinstance(ticks, list):
+        return jsonify({"status": "error", "message": "Body must be {\"ticks\": [...]}."}), 400
+
+    rows, rejected = [], []
+    for index, tick in enumerate(ticks):
+        try:
+            rows.append(ingest.tick_row(tick))
+        except (KeyError, TypeError, ValueError) as e:
+            rejected.append({"index": index, "message": f"Invalid tick: {e}"})
+    if rejected and not rows:
+        return jsonify({"status": "error", "message": "No valid ticks.", "rejected": rejected}), 400
+
+    try:
+        ingest_writer.put_many(rows)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 413
+    except queue.Full:
+        # Nothing from this request was queued, so the whole batch can be retried as is
+        return jsonify({"status": "error", "message": "Ingest queue is full, retry later."}), 503, {"Retry-After": "1"}
+    return jsonify({"status": "success", "queued": len(rows), "rejected": rejected}), 202
+
+
+@app.route("/latest")
+def get_latest():
+    """
+    Returns the latest price, liquidity and timestamp for each asset (optionally `?symbols=BTC,ETH`)
+    from the market_latest snapshot, one row per symbol, without touching the history tables.
+    """
+    try:
+        fmt = columnar.negotiate(request.args.get("format"), request.accept_mimetypes)
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+
+    symbols = []
+    for symbol in request.args.get("symbols", "").split(","):
+        symbol = symbol.strip().upper()
+        if symbol and not symbol.endswith("USDT"):
+            symbol += "USDT"
+        if symbol:
+            symbols.append(symbol)
+
+    try:
+        where = f"WHERE s.symbol IN ({', '.join(['%s'] * len(symbols))})" if symbols else ""
+        with db.cursor() as cur:
+            cur.execute(f"""
+                SELECT s.symbol, l.price, l.uniswap_liquidity, l.curve_liquidity, l.timestamp
+                FROM market_latest l JOIN symbols s ON s.id = l.symbol_id
+                {where}
+                ORDER BY s.symbol
+            """, symbols)
+            latest = cur.fetchall()
+
+        return history_response(fmt, {"status": "success"}, "latest", latest)
 
     except Exception as e:
+        logger.error(f"Error fetching latest market data: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
 @app.route("/historical-data")
 def get_historical_data():
     """
-    Fetches stored market data from MySQL.
-    Returns the latest price, liquidity, and timestamp for each asset.
+    Fetches stored market data rows from MySQL, newest first (every row, not one per asset:
+    use /latest for each asset's current price, liquidity and timestamp).
+    Supports `from`, `to`, `limit` and `resolution` (1m/5m/15m/1h/4h/1d OHLC buckets) query parameters.
+    `stream=ndjson` (or `Accept: application/x-ndjson`) / `stream=json` stream the rows instead;
+    `format=msgpack|arrow` (or the matching Accept type) returns typed columns, see history_response.
+    Non-streamed responses are capped at `limit` rows; see page_meta for the truncation fields.
     """
+    stream = request.args.get("stream")
+    if stream is None and request.accept_mimetypes.best == "application/x-ndjson":
+        stream = "ndjson"
+    if stream not in (None, "ndjson", "json"):
+        return jsonify({"status": "error", "message": "`stream` must be ndjson or json."}), 400
+
     try:
-        cur = conn.cursor(pymysql.cursors.DictCursor)
+        query = parse_history_args(request.args, streaming=stream is not None)
+        fmt = None if stream is not None else columnar.negotiate(request.args.get("format"), request.accept_mimetypes)
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
 
-        cur.execute("""
-            SELECT symbol, price, uniswap_liquidity, curve_liquidity, timestamp
-            FROM market_data
-            ORDER BY timestamp DESC
-        """)
+    if stream is not None:
+        return stream_historical_data(query, ndjson=stream == "ndjson")
 
+    try:
+        with db.cursor() as cur:
+            historical_data, next_to = fetch_history(cur, None, query, newest_first=True)
 
-        try:
-            historical_data = cur.fetchall()
-            cur.close()
-            logger.info(f"Retrieved {len(historical_data)} historical records.")
-            logger.info(jsonify({"status": "success", "historical_data": historical_data}))
-            return jsonify({"status": "success", "historical_data": historical_data})
-        except Exception as e:
-            cur.close()
+        if not historical_data:
             logger.error(f"No historical data found.")
             return jsonify({"status": "error", "message": "No historical data found."})
 
+        logger.info(f"Retrieved {len(historical_data)} historical records.")
+        return history_response(fmt, {"status": "success", "resolution": query.resolution, **page_meta(next_to)}, "historical_data", historical_data)
+
     except Exception as e:
         logger.error(f"Error fetching historical data: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+def page_meta(next_to) -> dict:
+    """
+    Paging fields for capped (non-streaming) history: `truncated` says older rows were cut off by
+    `limit`, and `next_to` is the unix-second `to` that fetches the next, older page.
+    """
+    return {"truncated": next_to is not None, "next_to": next_to}
+
+def history_response(fmt, meta: dict, key: str, data) -> Response:
+    """
+    JSON body `{**meta, key: data}` by default. For msgpack/Arrow the same rows (or matrix) are
+    sent column-oriented: int64 unix-second timestamps, float64 prices/liquidity (NULL as NaN),
+    so analytics clients can load them straight into NumPy without parsing JSON.
+    """
+    if fmt is None:
+        return jsonify({**meta, key: data})
+
+    columns = columnar.columns_from_dict(data) if isinstance(data, dict) else columnar.columns_from_rows(data)
+    return Response(columnar.encode(fmt, meta, columns), mimetype=columnar.MIMETYPES[fmt])
+
+def stream_historical_data(query, ndjson: bool) -> Response:
+    """
+    Streams the query result in DB_STREAM_CHUNK-row chunks straight from an unbuffered cursor,
+    either as one JSON object per line or as a single JSON document written incrementally.
+    The pooled connection is held by the generator and released when it finishes or is closed.
+    """
+    rows = db.stream_rows(*build_history_sql(None, query, newest_first=True))
+
+    def generate():
+        count = 0
+        try:
+            if not ndjson:
+                yield f'{{"status": "success", "resolution": {flask_json.dumps(query.resolution)}, "historical_data": ['
+            for chunk in rows:
+                encoded = [flask_json.dumps(row) for row in chunk]
+                if ndjson:
+                    yield "\n".join(encoded) + "\n"
+                else:
+                    yield ("," if count else "") + ",".join(encoded)
+                count += len(chunk)
+            if not ndjson:
+                yield "]}"
+            logger.info(f"Streamed {count} historical records.")
+        except Exception as e:
+            # Headers are already sent, so the error can only be logged; the client sees a truncated body
+            logger.error(f"Error streaming historical data after {count} records: {str(e)}")
+            raise
+        finally:
+            rows.close()
+
+    mimetype = "application/x-ndjson" if ndjson else "application/json"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
 @app.route("/qaoa-arbitrage")
 def get_qaoa_arbitrage():
+    """
+    Runs a QAOA arbitrage job and waits for its trade log.
+    Concurrent callers share the same job; use /qaoa-arbitrage/jobs to avoid blocking.
+    """
     try:
-        return jsonify({"status": "success", "log": qaoa_arbitrage.execute_trades()})
+        job = qaoa_jobs.wait(qaoa_jobs.submit()["job_id"])
+        if job["status"] != "succeeded":
+            return jsonify({"status": "error", "message": job.get("error", job["status"])})
+        return jsonify({"status": "success", "log": job["result"]})
     except Exception as e:
         logger.error(f"Error executing QAOA arbitrage: {str(e)}")
         return jsonify({"status": "error", "message": str(e)})
 
+
+@app.route("/qaoa-arbitrage/jobs", methods=["POST"])
+def submit_qaoa_job():
+    """Starts a QAOA arbitrage job (or joins the one already running) and returns its ID immediately."""
+    try:
+        job = qaoa_jobs.submit()
+        return jsonify({"status": "success", "job": job}), 202
+    except Exception as e:
+        logger.error(f"Error submitting QAOA job: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@app.route("/qaoa-arbitrage/jobs/<job_id>", methods=["GET", "DELETE"])
+def qaoa_job(job_id):
+    """GET polls a job's status and current stage; DELETE cancels it."""
+    job = qaoa_jobs.cancel(job_id) if request.method == "DELETE" else qaoa_jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"No job {job_id}"}), 404
+    return jsonify({"status": "success", "job": job})
+
 @app.route("/history/<symbol>")
 def get_full_history(symbol):
     """
-    Fetches the full historical price data for a given trading pair.
-    Returns all recorded prices and timestamps.
+    Fetches historical price data for a given trading pair, oldest first.
+    Supports `from`, `to`, `limit` (most recent rows) and `resolution` (1m/5m/15m/1h/4h/1d OHLC buckets).
     """
+    try:
+        query = parse_history_args(request.args)
+        fmt = columnar.negotiate(request.args.get("format"), request.accept_mimetypes)
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
     try:
         # If symbol doesn't already end with 'USDT', append it.
         if not symbol.upper().endswith("USDT"):
             symbol += "USDT"
 
         logger.info(f"Fetching historical data for {symbol}...")
-        cur = conn.cursor(pymysql.cursors.DictCursor)
-
-        cur.execute("""
-            SELECT symbol, price, uniswap_liquidity, curve_liquidity, timestamp
-            FROM market_data
-            WHERE symbol = %s
-            ORDER BY timestamp ASC
-        """, (symbol,))
-
-        history_data = cur.fetchall()
-        cur.close()
+        with db.cursor() as cur:
+            history_data, next_to = fetch_history(cur, [symbol], query)
 
         if not history_data:
             return jsonify({"status": "error", "message": f"No historical data found for {symbol}"}), 404
 
         logger.info(f"Retrieved {len(history_data)} historical records for {symbol}.")
-        return jsonify({"status": "success", "symbol": symbol, "history": history_data})
+        return history_response(fmt, {"status": "success", "symbol": symbol, "resolution": query.resolution, **page_meta(next_to)}, "history", history_data)
 
     except Exception as e:
         logger.error(f"Error fetching history for {symbol}: {str(e)}")
@@ -182,9 +357,17 @@ def get_full_history(symbol):
 @app.route("/history/<symbol1>/<symbol2>")
 def get_dual_history(symbol1, symbol2):
     """
-    Fetches the full historical price data for two trading pairs in a single query.
-    Returns all recorded prices and timestamps for both symbols.
+    Fetches historical price data for two trading pairs in a single query.
+    Accepts the same `from`, `to`, `limit` and `resolution` parameters as /history/<symbol>.
     """
+    try:
+        query = parse_history_args(request.args)
+        fmt = columnar.negotiate(request.args.get("format"), request.accept_mimetypes)
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
     try:
         # Normalize both symbols to end with 'USDT'
         if not symbol1.upper().endswith("USDT"):
@@ -193,18 +376,9 @@ def get_dual_history(symbol1, symbol2):
             symbol2 += "USDT"
 
         logger.info(f"Fetching historical data for {symbol1} and {symbol2}...")
-        cur = conn.cursor(pymysql.cursors.DictCursor)
-
-        # Use WHERE symbol IN (%s, %s) to get data for both symbols in one query
-        cur.execute("""
-            SELECT symbol, price, uniswap_liquidity, curve_liquidity, timestamp
-            FROM market_data
-            WHERE symbol IN (%s, %s)
-            ORDER BY timestamp ASC
-        """, (symbol1, symbol2))
-
-        history_data = cur.fetchall()
-        cur.close()
+        with db.cursor() as cur:
+            # Use WHERE symbol IN (%s, %s) to get data for both symbols in one query
+            history_data, next_to = fetch_history(cur, [symbol1, symbol2], query)
 
         if not history_data:
             return jsonify({
@@ -214,18 +388,71 @@ def get_dual_history(symbol1, symbol2):
 
         logger.info(f"Retrieved {len(history_data)} total records for {symbol1} and {symbol2}.")
 
-        return jsonify({
+        return history_response(fmt, {
             "status": "success",
             "symbols": [symbol1, symbol2],
-            "history": history_data
-        })
+            "resolution": query.resolution,
+            **page_meta(next_to)
+        }, "history", history_data)
 
     except Exception as e:
         logger.error(f"Error fetching history for {symbol1} and {symbol2}: {str(e)}")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 
+@app.route("/history-matrix")
+def get_history_matrix():
+    """
+    Fetches history for any number of trading pairs (`?symbols=BTC,ETH,SOL`) as a time-aligned matrix:
+    a `timestamp` column plus one forward-filled price column per symbol.
+    Accepts the same `from`, `to`, `limit` and `resolution` parameters as /history/<symbol>.
+    """
+    try:
+        query = parse_history_args(request.args)
+        fmt = columnar.negotiate(request.args.get("format"), request.accept_mimetypes)
+    except columnar.UnsupportedFormat as e:
+        return jsonify({"status": "error", "message": str(e)}), 406
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+
+    symbols = []
+    for symbol in request.args.get("symbols", "").split(","):
+        symbol = symbol.strip().upper()
+        if symbol and not symbol.endswith("USDT"):
+            symbol += "USDT"
+        if symbol and symbol not in symbols:
+            symbols.append(symbol)
+
+    if not 0 < len(symbols) <= MATRIX_MAX_SYMBOLS:
+        return jsonify({"status": "error", "message": f"Pass between 1 and {MATRIX_MAX_SYMBOLS} symbols."}), 400
+
+    try:
+        logger.info(f"Fetching history matrix for {symbols}...")
+        with db.cursor() as cur:
+            history_data, next_to = fetch_history(cur, symbols, query)
+
+        if not history_data:
+            return jsonify({"status": "error", "message": f"No historical data found for {', '.join(symbols)}"}), 404
+
+        return history_response(fmt, {
+            "status": "success",
+            "symbols": symbols,
+            "resolution": query.resolution,
+            **page_meta(next_to)
+        }, "matrix", build_price_matrix(history_data, symbols))
+
+    except Exception as e:
+        logger.error(f"Error fetching history matrix for {symbols}: {str(e)}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+
+def run(debug: bool = True):
+    # With the debug reloader the first process only watches files; the reloaded child
+    # (WERKZEUG_RUN_MAIN=true) is the one that serves requests
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_services()
+    app.run(host="0.0.0.0", port=5000, debug=debug)
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    run()
\ No newline at end of file
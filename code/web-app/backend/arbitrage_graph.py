@@ -0,0 +1,113 @@
+import asyncio
+from itertools import permutations
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+import networkx as nx
+from concurrency import gather_bounded
+from edge_weights import EdgeWeightEngine
+
+Pair = Tuple[str, str]
+
+
+def priced_pairs(tokens: Iterable[str], prices: Dict[str, float]) -> List[Pair]:
+    """Every ordered token pair for which both sides have a price."""
+    return [(tokenA, tokenB) for tokenA, tokenB in permutations(tokens, 2) if tokenA in prices and tokenB in prices]
+
+
+def pool_key(addresses: Dict[str, str], tokenA: str, tokenB: str) -> Pair:
+    """
+    The pool's (token0, token1) addresses: Uniswap orders a pair's tokens by address, so A->B and
+    B->A (and any symbols sharing an address) map to the same pool and the same reserve snapshot.
+    """
+    return tuple(sorted((addresses[tokenA], addresses[tokenB]), key=lambda address: int(address, 16)))
+
+
+def oriented_reserves(addresses: Dict[str, str], tokenA: str, tokenB: str, snapshot: Sequence[int]) -> Tuple[int, int]:
+    """(reserve of tokenA, reserve of tokenB) from a getReserves() snapshot in token0/token1 order."""
+    reserve0, reserve1 = snapshot[:2]
+    token0, _ = pool_key(addresses, tokenA, tokenB)
+    return (reserve0, reserve1) if addresses[tokenA] == token0 else (reserve1, reserve0)
+
+
+async def fetch_pair_inputs(pairs: Sequence[Pair], addresses: Dict[str, str],
+                            fetch_bridge_fee: Callable[[str, str], Awaitable[float]],
+                            fetch_reserves: Callable[[str, str], Awaitable[Optional[Sequence[int]]]]):
+    """
+    Fans out every directed pair's bridge fee and every pool's reserves at once (two independent
+    bounded fan-outs, one per upstream). Reserves are read once per pool, not once per direction.
+    Returns `(fees keyed by pair, snapshots keyed by pool)`. A failed or timed-out fee lookup is
+    reported and counts as a fee of 0; a failed reserve lookup is reported and its pool left out.
+    """
+    pools: Dict[Pair, Pair] = {}
+    for tokenA, tokenB in pairs:
+        if addresses[tokenA] != addresses[tokenB]:
+            pools.setdefault(pool_key(addresses, tokenA, tokenB), (tokenA, tokenB))
+
+    fee_results, reserve_results = await asyncio.gather(
+        gather_bounded(lambda pair: fetch_bridge_fee(*pair), pairs),
+        gather_bounded(lambda pool: fetch_reserves(*pools[pool]), list(pools)),
+    )
+
+    fees, reserves = {}, {}
+    fee_failures = 0
+    for result in fee_results:
+        if result.ok:
+            fees[result.item] = result.value
+        else:
+            # Same fallback as a fee lookup that fails inside the fetcher: keep the edge, assume no fee
+            fees[result.item] = 0
+            fee_failures += 1
+            print(f"⚠️ Bridge fee for {result.item[0]}-{result.item[1]} unavailable ({result.error!r}); using 0")
+    if fee_failures:
+        print(f"⚠️ {fee_failures} of {len(pairs)} bridge fee lookups failed; those edges assume a fee of 0")
+    for result in reserve_results:
+        if result.ok:
+            reserves[result.item] = result.value
+        else:
+            tokenA, tokenB = pools[result.item]
+            print(f"❌ Error fetching reserves for {tokenA}-{tokenB}: {result.error}")
+    return fees, reserves
+
+
+def weight_engine(prices: Dict[str, float], addresses: Dict[str, str], pairs: Sequence[Pair],
+                  fees: Dict[Pair, float], reserves: Dict[Pair, Optional[Sequence[int]]], gas_cost: float) -> EdgeWeightEngine:
+    """Loads prices, oriented pool reserves and fees into an engine over the priced tokens."""
+    engine = EdgeWeightEngine([token for token in addresses if token in prices])
+    for tokenA, tokenB in pairs:
+        if (tokenA, tokenB) in fees:
+            engine.set_fee(tokenA, tokenB, fees[(tokenA, tokenB)])
+        if addresses[tokenA] == addresses[tokenB]:
+            continue
+        snapshot = reserves.get(pool_key(addresses, tokenA, tokenB))
+        if snapshot:
+            engine.set_pool(tokenA, tokenB, *oriented_reserves(addresses, tokenA, tokenB, snapshot))
+    engine.prices[:] = [prices[token] for token in engine.tokens]
+    engine.refresh_costs(gas_cost)
+    return engine
+
+
+def assemble_graph(prices: Dict[str, float], addresses: Dict[str, str], pairs: Sequence[Pair],
+                   fees: Dict[Pair, float], reserves: Dict[Pair, Optional[Sequence[int]]], gas_cost: float) -> nx.DiGraph:
+    """Adds an edge for every pair whose pool has reserves and whose net weight is positive."""
+    G = nx.DiGraph()
+    engine = weight_engine(prices, addresses, pairs, fees, reserves, gas_cost)
+    for tokenA, tokenB, weight in engine.edges():
+        G.add_edge(tokenA, tokenB, weight=weight)
+    return G
+
+
+async def build_arbitrage_graph(prices: Dict[str, float], addresses: Dict[str, str],
+                                fetch_reserves: Callable[[str, str], Awaitable[Optional[Sequence[int]]]],
+                                fetch_bridge_fee: Callable[[str, str], Awaitable[float]],
+                                fetch_gas_fee: Callable[[], Awaitable[float]]) -> nx.DiGraph:
+    """
+    Concurrent graph pipeline: the gas price, every pair's bridge fee and every pool's reserves
+    are fetched together, and the graph is assembled once they are all back, so build time tracks
+    the slowest round trip rather than pairs x lookups x latency.
+    `addresses` maps each token symbol to its address (e.g. registry.TOKEN_ADDRESSES).
+    """
+    pairs = priced_pairs(addresses, prices)
+    gas_cost, (fees, reserves) = await asyncio.gather(
+        fetch_gas_fee(),
+        fetch_pair_inputs(pairs, addresses, fetch_bridge_fee, fetch_reserves),
+    )
+    return assemble_graph(prices, addresses, pairs, fees, reserves, gas_cost)
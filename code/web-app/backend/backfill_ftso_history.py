@@ -0,0 +1,121 @@
+import os
+import json
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+from concurrency import gather_bounded, run_blocking
+from registry import FEED_IDS, FLARE_RPC_URL, read_feeds_raw
+from ftso_price_service import FTSO_EPOCH_SECONDS
+from ingest import feed_row, upsert_market_rows
+import web3_pool
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+# Historical eth_calls need an archive node; the public Coston2 RPC keeps only recent state
+ARCHIVE_RPC_URL = os.getenv("FLARE_ARCHIVE_RPC_URL", FLARE_RPC_URL)
+CHUNK_SIZE = 50  # sampled blocks per checkpointed unit of work
+
+async def block_timestamp(w3, number: int) -> int:
+    return (await w3.eth.get_block(number))["timestamp"]
+
+
+async def find_block(w3, timestamp: int, lo: int, hi: int) -> int:
+    """Binary search for the first block at or after `timestamp`."""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if await block_timestamp(w3, mid) < timestamp:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def sample_blocks(start_block: int, end_block: int, start_ts: int, end_ts: int, step_seconds: int) -> List[int]:
+    """One block per `step_seconds`, assuming a roughly constant block time across the range."""
+    samples = max(1, (end_ts - start_ts) // step_seconds)
+    stride = max(1, (end_block - start_block) // samples)
+    return list(range(start_block, end_block + 1, stride))
+
+
+class Checkpoint:
+    """Completed chunks for one backfill run, persisted to JSON so an interrupted run can resume."""
+
+    def __init__(self, path: str, run_key: Dict):
+        self.path = path
+        self.run_key = run_key
+        self.done = set()
+
+        if os.path.exists(path):
+            with open(path) as f:
+                saved = json.load(f)
+            if saved.get("run") == run_key:
+                self.done = set(saved.get("done", []))
+                logger.info(f"Resuming backfill: {len(self.done)} chunks already done.")
+
+    def mark_done(self, chunk_start: int):
+        self.done.add(chunk_start)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"run": self.run_key, "done": sorted(self.done)}, f)
+        os.replace(tmp, self.path)
+
+
+async def backfill(start: datetime, end: datetime, symbols: List[str], step_seconds: int, concurrency: int, checkpoint_path: str):
+    w3 = await web3_pool.get_web3(ARCHIVE_RPC_URL)
+    feed_ids = [FEED_IDS[symbol] for symbol in symbols]
+
+    start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+    latest = await w3.eth.block_number
+    start_block = await find_block(w3, start_ts, 0, latest)
+    end_block = await find_block(w3, end_ts, start_block, latest)
+    blocks = sample_blocks(start_block, end_block, start_ts, end_ts, step_seconds)
+    logger.info(f"Backfilling {len(symbols)} feeds over blocks {start_block}-{end_block} ({len(blocks)} samples).")
+
+    checkpoint = Checkpoint(checkpoint_path, {
+        "start": start_ts, "end": end_ts, "symbols": symbols, "step": step_seconds,
+    })
+    chunks = [blocks[i:i + CHUNK_SIZE] for i in range(0, len(blocks), CHUNK_SIZE)]
+    pending = [chunk for chunk in chunks if chunk[0] not in checkpoint.done]
+
+    async def process_chunk(chunk: List[int]):
+        rows = {}
+        for block in chunk:
+            for symbol, (value, decimals, timestamp) in zip(symbols, await read_feeds_raw(w3, feed_ids, block)):
+                # Consecutive samples often see the same feed round; keep one row per (symbol, timestamp)
+                rows[(symbol, timestamp)] = feed_row(symbol, value, decimals, timestamp)
+
+        await run_blocking(upsert_market_rows, list(rows.values()))
+        checkpoint.mark_done(chunk[0])
+        return len(rows)
+
+    # A chunk is many sequential reads, so rely on the per-request HTTP timeout rather than a per-chunk one
+    results = await gather_bounded(process_chunk, pending, limit=concurrency, timeout=None)
+
+    failed = [result for result in results if not result.ok]
+    inserted = sum(result.value for result in results if result.ok)
+    for result in failed:
+        logger.error(f"Chunk starting at block {result.item[0]} failed: {result.error}")
+    logger.info(f"Backfill inserted {inserted} rows; {len(failed)} chunks failed (re-run to retry them).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill historical FTSO prices into market_data.")
+    parser.add_argument("--start", required=True, help="start date, YYYY-MM-DD (UTC)")
+    parser.add_argument("--end", required=True, help="end date, YYYY-MM-DD (UTC)")
+    parser.add_argument("--symbols", default=",".join(FEED_IDS.keys()), help="comma separated feed symbols")
+    parser.add_argument("--step", type=int, default=FTSO_EPOCH_SECONDS, help="seconds between samples")
+    parser.add_argument("--concurrency", type=int, default=8, help="chunks read in parallel")
+    parser.add_argument("--checkpoint", default="backfill_checkpoint.json")
+    args = parser.parse_args()
+
+    start = datetime.strptime(args.start, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    end = datetime.strptime(args.end, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    symbols = [s for s in args.symbols.split(",") if s in FEED_IDS]
+
+    web3_pool.run(backfill(start, end, symbols, args.step, args.concurrency, args.checkpoint))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+import rpc_transport
+
+logger = logging.getLogger(__name__)
+
+BRIDGE_FEES_URL = os.getenv("BRIDGE_FEES_URL", "https://stargate.finance/api/bridge-fees")
+BRIDGE_FEE_TTL_SECONDS = float(os.getenv("BRIDGE_FEE_TTL_SECONDS", "300"))
+# Past the TTL a cached table is still served (and refreshed in the background) up to this age
+BRIDGE_FEE_MAX_STALE_SECONDS = float(os.getenv("BRIDGE_FEE_MAX_STALE_SECONDS", "3600"))
+# After a failed fetch with nothing cached, lookups fail fast for this long instead of re-fetching
+BRIDGE_FEE_RETRY_SECONDS = float(os.getenv("BRIDGE_FEE_RETRY_SECONDS", "30"))
+
+
+class BridgeFeeProvider:
+    """
+    Serves per-pair bridge fees from one in-memory copy of the full fee table.
+    The table is fetched at most once per TTL window, concurrent lookups share a single in-flight
+    fetch, and a stale table keeps being served while a background refresh replaces it.
+    Must be used from one event loop (the web3 pool's).
+    """
+
+    def __init__(self, url: str = BRIDGE_FEES_URL, ttl: float = BRIDGE_FEE_TTL_SECONDS,
+                 max_stale: float = BRIDGE_FEE_MAX_STALE_SECONDS):
+        self.url = url
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._table: Optional[Dict[str, Any]] = None
+        self._fetched_at = 0.0
+        self._failed_at: Optional[float] = None
+        self._error: Optional[Exception] = None
+        self._refreshing: Optional[asyncio.Task] = None
+
+    async def _fetch(self) -> Dict[str, Any]:
+        try:
+            table = await rpc_transport.get_json(self.url)
+        except Exception as e:
+            self._failed_at, self._error = time.monotonic(), e
+            raise
+        self._table, self._fetched_at, self._failed_at = table, time.monotonic(), None
+        logger.info(f"Fetched bridge fee table ({len(table)} routes)")
+        return table
+
+    def _refresh(self) -> asyncio.Task:
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch())
+            # Background refreshes may never be awaited; don't let their failures go unretrieved
+            self._refreshing.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return self._refreshing
+
+    async def table(self) -> Dict[str, Any]:
+        age = time.monotonic() - self._fetched_at
+        if self._table is not None and age < self.ttl:
+            return self._table
+
+        backing_off = self._failed_at is not None and time.monotonic() - self._failed_at < BRIDGE_FEE_RETRY_SECONDS
+        if self._table is not None and age < self.max_stale:
+            if not backing_off:
+                self._refresh()  # stale-while-revalidate
+            return self._table
+
+        if backing_off:
+            raise self._error
+        # shield: a caller timing out must not cancel the fetch other lookups are waiting on
+        return await asyncio.shield(self._refresh())
+
+    async def fee(self, tokenA: str, tokenB: str) -> float:
+        """Bridge fee for moving tokenA -> tokenB (0 for routes the table doesn't list)."""
+        table = await self.table()
+        return float(table.get(f"{tokenA}-{tokenB}", {}).get("fee", 0))
+
+
+provider = BridgeFeeProvider()
+
+fee = provider.fee
@@ -0,0 +1,116 @@
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are unavailable without it
+    msgpack = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # Arrow responses are unavailable without it
+    pa = None
+
+JSON_MIMETYPE = "application/json"
+MIMETYPES = {
+    "msgpack": "application/msgpack",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# Alternative spellings clients send in Accept headers
+ACCEPT_ALIASES = {"application/x-msgpack": "msgpack"}
+
+Column = Union[np.ndarray, List[str]]
+
+
+class UnsupportedFormat(ValueError):
+    """Raised when a client asks for a binary format that is unknown or not installed."""
+
+
+def available(fmt: str) -> bool:
+    return (fmt == "msgpack" and msgpack is not None) or (fmt == "arrow" and pa is not None)
+
+
+def negotiate(format_arg: Optional[str], accept_mimetypes) -> Optional[str]:
+    """
+    Picks the response format from an explicit `format` parameter, else the Accept header.
+    Returns "msgpack" / "arrow", or None for the default JSON body.
+    """
+    if format_arg:
+        fmt = format_arg.lower()
+        if fmt == "json":
+            return None
+    else:
+        offered = [JSON_MIMETYPE, *MIMETYPES.values(), *ACCEPT_ALIASES]
+        best = accept_mimetypes.best_match(offered, default=JSON_MIMETYPE)
+        if best == JSON_MIMETYPE:
+            return None
+        fmt = ACCEPT_ALIASES.get(best) or next(name for name, mimetype in MIMETYPES.items() if mimetype == best)
+
+    if fmt not in MIMETYPES:
+        raise UnsupportedFormat(f"`format` must be json, {' or '.join(MIMETYPES)}.")
+    if not available(fmt):
+        raise UnsupportedFormat(f"{fmt} responses are not available on this server.")
+    return fmt
+
+
+def to_column(values: Sequence[Any]) -> Column:
+    """
+    Converts one column of row values to a typed array: datetimes become int64 unix seconds,
+    integers int64, other numbers (including DECIMAL) float64 with NULL as NaN; strings stay a list.
+    """
+    sample = next((v for v in values if v is not None), None)
+    if isinstance(sample, str):
+        return list(values)
+    if isinstance(sample, datetime):
+        return np.array(values, dtype="datetime64[s]").astype(np.int64)
+    if isinstance(sample, int) and not isinstance(sample, bool) and all(v is not None for v in values):
+        return np.array(values, dtype=np.int64)
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def columns_from_rows(rows: Sequence[Dict[str, Any]]) -> Dict[str, Column]:
+    """Transposes dict rows (as returned by a dictionary cursor) into named typed columns."""
+    if not rows:
+        return {}
+    return {key: to_column([row[key] for row in rows]) for key in rows[0]}
+
+
+def columns_from_dict(data: Dict[str, Sequence[Any]]) -> Dict[str, Column]:
+    """Types an already column-oriented dict of lists (e.g. a price matrix)."""
+    return {key: to_column(values) for key, values in data.items()}
+
+
+def _msgpack_column(column: Column) -> Any:
+    if isinstance(column, list):
+        return column
+    # Raw little-endian buffer: np.frombuffer(col["data"], col["dtype"]) on the client
+    dtype = column.dtype.newbyteorder("<")
+    return {"dtype": dtype.str, "shape": list(column.shape), "data": column.astype(dtype).tobytes()}
+
+
+def encode_msgpack(meta: Dict[str, Any], columns: Dict[str, Column]) -> bytes:
+    body = dict(meta)
+    body["columns"] = {name: _msgpack_column(column) for name, column in columns.items()}
+    return msgpack.packb(body, use_bin_type=True)
+
+
+def encode_arrow(meta: Dict[str, Any], columns: Dict[str, Column]) -> bytes:
+    """Arrow IPC stream of one record batch; the response metadata travels as schema metadata (JSON values)."""
+    arrays = {name: pa.array(column, type=pa.string()) if isinstance(column, list) else pa.array(column)
+              for name, column in columns.items()}
+    table = pa.table(arrays, metadata={key: json.dumps(value) for key, value in meta.items()})
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(fmt: str, meta: Dict[str, Any], columns: Dict[str, Column]) -> bytes:
+    """Serialises `columns` plus response metadata in the negotiated binary format."""
+    if fmt == "msgpack":
+        return encode_msgpack(meta, columns)
+    return encode_arrow(meta, columns)
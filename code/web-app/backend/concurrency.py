@@ -0,0 +1,49 @@
+import os
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List, NamedTuple, Optional
+
+
+# Defaults for every per-symbol / per-pair RPC fan-out in the backend
+RPC_CONCURRENCY = int(os.getenv("RPC_CONCURRENCY", "16"))
+RPC_TIMEOUT = float(os.getenv("RPC_TIMEOUT", "10"))
+
+
+class FanOutResult(NamedTuple):
+    """Outcome of one item in a fan-out: either `value` is set or `error` holds the exception."""
+    item: Any
+    value: Any
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def gather_bounded(
+    fn: Callable[[Any], Awaitable[Any]],
+    items: Iterable[Any],
+    limit: int = RPC_CONCURRENCY,
+    timeout: Optional[float] = RPC_TIMEOUT,
+) -> List[FanOutResult]:
+    """
+    Runs `fn(item)` for every item concurrently, with at most `limit` calls in flight.
+    Each call gets its own timeout; failures are captured per item instead of aborting the batch.
+    Results are returned in the same order as `items`.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            try:
+                value = await asyncio.wait_for(fn(item), timeout)
+                return FanOutResult(item, value, None)
+            except Exception as e:
+                return FanOutResult(item, None, e)
+
+    return list(await asyncio.gather(*(run(item) for item in items)))
+
+
+async def run_blocking(fn: Callable[..., Any], *args) -> Any:
+    """Runs a blocking call (e.g. `requests.get`) in the default executor so it doesn't stall the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, fn, *args)
@@ -0,0 +1,125 @@
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import mysql.connector
+from mysql.connector import errorcode, errors, pooling
+
+logger = logging.getLogger(__name__)
+
+# Database connection
+db_config = {
+    "host": os.getenv("DB_HOST", "mysql"),
+    "user": os.getenv("DB_USER", "myuser"),
+    "password": os.getenv("DB_PASSWORD", "mypassword"),
+    "database": os.getenv("DB_NAME", "mydatabase"),
+    # Naive datetimes are UTC throughout (ingest, history queries, rollup buckets); pin the session
+    # zone so TIMESTAMP columns and UNIX_TIMESTAMP()/FROM_UNIXTIME() agree with them on any server
+    "time_zone": "+00:00",
+}
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))  # mysql.connector caps a pool at 32 connections
+DB_CHECKOUT_TIMEOUT = float(os.getenv("DB_CHECKOUT_TIMEOUT", "10"))
+DB_STREAM_CHUNK = int(os.getenv("DB_STREAM_CHUNK", "1000"))
+
+
+class ConnectionPool:
+    """
+    Thread-safe MySQL connection pool. Each request checks out its own connection,
+    which is health-checked (and transparently reconnected) before use and returned on exit.
+    Checkouts block for up to DB_CHECKOUT_TIMEOUT when every connection is busy.
+    """
+
+    def __init__(self, size: int = DB_POOL_SIZE, config: dict = db_config):
+        self.size = size
+        self.config = config
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> pooling.MySQLConnectionPool:
+        with self._lock:
+            retries = 5
+            while self._pool is None:
+                try:
+                    self._pool = pooling.MySQLConnectionPool(pool_name="market_data", pool_size=self.size, **self.config)
+                    logger.info(f"Database pool created with {self.size} connections.")
+                except mysql.connector.Error as err:
+                    retries -= 1
+                    if retries == 0:
+                        raise ConnectionError("Could not connect to the database after multiple attempts")
+                    logger.warning(f"Database connection failed: {err}")
+                    time.sleep(5)  # Wait before retrying
+            return self._pool
+
+    @contextmanager
+    def connection(self):
+        """Checks out a pooled connection for the duration of the `with` block."""
+        if not self._slots.acquire(timeout=DB_CHECKOUT_TIMEOUT):
+            raise TimeoutError("No database connection available.")
+
+        conn = None
+        try:
+            conn = self._get_pool().get_connection()
+            conn.ping(reconnect=True, attempts=3, delay=1)
+            yield conn
+        finally:
+            if conn is not None:
+                conn.close()  # returns it to the pool
+            self._slots.release()
+
+    @contextmanager
+    def cursor(self, dictionary: bool = True, commit: bool = False):
+        """Yields a cursor on a pooled connection; commits on success if `commit`, rolls back on error."""
+        with self.connection() as conn:
+            cur = conn.cursor(dictionary=dictionary)
+            try:
+                yield cur
+                if commit:
+                    conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    def stream_rows(self, sql: str, params=(), chunk_size: int = DB_STREAM_CHUNK):
+        """
+        Generator of row chunks (lists of dicts) read from an unbuffered cursor, so the result set
+        is pulled from the server as it is consumed instead of being materialised in memory.
+        Holds a pooled connection until exhausted or closed.
+        """
+        with self.connection() as conn:
+            cur = conn.cursor(dictionary=True, buffered=False)
+            finished = False
+            try:
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield rows
+                finished = True
+            finally:
+                if not finished:
+                    # Abandoned mid-stream (e.g. client disconnected): drain so the connection is reusable
+                    conn.consume_results()
+                cur.close()
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    True for failures worth retrying unchanged (lost/unavailable connections, deadlocks, lock waits),
+    False for errors caused by the statement or its data, which would fail the same way again.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, errors.InterfaceError, errors.OperationalError, errors.PoolError)):
+        return True
+    return getattr(error, "errno", None) in (errorcode.ER_LOCK_DEADLOCK, errorcode.ER_LOCK_WAIT_TIMEOUT)
+
+
+pool = ConnectionPool()
+
+connection = pool.connection
+cursor = pool.cursor
+stream_rows = pool.stream_rows
@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Dict, Optional, Sequence, Tuple
+
+TRADE_SIZE = 1000
+
+
+class EdgeWeightEngine:
+    """
+    Edge weights for every directed token pair, held as arrays over a fixed token universe:
+
+    - `prices[i]`: price of token i (NaN if unknown)
+    - `reserves[i, j]`: token i's reserve in the i/j pool, so edge i -> j trades against
+      `reserves[i, j]` in and `reserves[j, i]` out (NaN if there is no pool)
+    - `fees[i, j]`: bridge fee for moving i -> j (NaN if unknown)
+
+    Slippage, gas and bridge costs only change when reserves, fees or gas do, so they are folded
+    into one cost matrix up front; a price move then costs one outer division and a subtraction.
+    """
+
+    def __init__(self, tokens: Sequence[str], trade_size: float = TRADE_SIZE):
+        self.tokens = list(tokens)
+        self.index = {token: i for i, token in enumerate(self.tokens)}
+        self.trade_size = trade_size
+        n = len(self.tokens)
+        self.prices = np.full(n, np.nan)
+        self.reserves = np.full((n, n), np.nan)
+        self.fees = np.full((n, n), np.nan)
+        self.gas_cost = 0.0
+        self._cost = np.full((n, n), np.nan)
+        self._weights = np.full((n, n), np.nan)
+
+    def set_prices(self, prices: Dict[str, float]):
+        """Replaces every price (tokens missing from `prices` become unknown)."""
+        self.prices[:] = [prices.get(token, np.nan) for token in self.tokens]
+        self._reweigh()
+
+    def update_price(self, token: str, price: float):
+        """Moves one price and re-weighs only that token's row and column."""
+        i = self.index[token]
+        self.prices[i] = price
+        with np.errstate(divide="ignore", invalid="ignore"):
+            self._weights[i, :] = self.prices / price - 1 - self._cost[i, :]
+            self._weights[:, i] = price / self.prices - 1 - self._cost[:, i]
+        self._weights[i, i] = np.nan
+
+    def set_pool(self, tokenA: str, tokenB: str, reserveA: float, reserveB: float):
+        """Records the tokenA/tokenB pool's reserves (call `refresh_costs` after a batch of updates)."""
+        a, b = self.index[tokenA], self.index[tokenB]
+        self.reserves[a, b], self.reserves[b, a] = reserveA, reserveB
+
+    def set_fee(self, tokenA: str, tokenB: str, fee: float):
+        """Records the bridge fee for tokenA -> tokenB (call `refresh_costs` after a batch of updates)."""
+        self.fees[self.index[tokenA], self.index[tokenB]] = fee
+
+    def refresh_costs(self, gas_cost: Optional[float] = None):
+        """Rebuilds the slippage + gas + bridge cost matrix, then re-weighs every pair."""
+        if gas_cost is not None:
+            self.gas_cost = gas_cost
+        reserve_in, reserve_out, size = self.reserves, self.reserves.T, self.trade_size
+        with np.errstate(divide="ignore", invalid="ignore"):
+            slippage = np.abs(reserve_out / reserve_in - (reserve_out - size) / (reserve_in + size))
+        # An empty pool has no price to slip from: treat it like a missing one
+        slippage[~(reserve_in > 0)] = np.nan
+        self._cost = slippage + self.gas_cost / size + self.fees / size
+        np.fill_diagonal(self._cost, np.nan)
+        self._reweigh()
+
+    def _reweigh(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.subtract(self.prices[None, :] / self.prices[:, None] - 1, self._cost, out=self._weights)
+
+    def weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        """(weights rounded to 5 d.p., mask of profitable edges); weights[i, j] is the edge i -> j."""
+        with np.errstate(invalid="ignore"):
+            mask = self._weights > 0
+        return np.round(self._weights, 5), mask
+
+    def edges(self):
+        """(tokenA, tokenB, weight) for every profitable edge."""
+        weights, mask = self.weights()
+        for i, j in zip(*np.nonzero(mask)):
+            yield self.tokens[i], self.tokens[j], float(weights[i, j])
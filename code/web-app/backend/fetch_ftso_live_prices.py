@@ -1,90 +1,94 @@
 import json
-import asyncio
-import ssl
-import certifi
 from datetime import datetime
-from web3 import AsyncHTTPProvider, AsyncWeb3
-from typing import List, Dict
+from web3 import AsyncWeb3
+from typing import List, Dict, Optional, Tuple
 import sys
+from concurrency import gather_bounded
+from registry import (
+    FEED_IDS, FLARE_RPC_URL, FTSOV2_ADDRESS, GET_FEED_BY_ID_CALLDATA, MULTICALL3_ABI, MULTICALL3_ADDRESS,
+    decode_feed, eth_call_raw, read_feeds_raw,
+)
+import web3_pool
 
+RPC_URL = FLARE_RPC_URL
 
-# FtsoV2 address (Flare Testnet Coston2)
-FTSOV2_ADDRESS = "0x3d893C53D9e8056135C26C8c638B76C8b60Df726"
-RPC_URL = "https://coston2-api.flare.network/ext/C/rpc"
-# Feed IDs for Flare FTSO
-FEED_IDS = {
-    "AAVE": "0x01414156452f555344000000000000000000000000",
-    "ADA": "0x014144412f55534400000000000000000000000000",
-    "ALGO": "0x01414c474f2f555344000000000000000000000000",
-    "APT": "0x014150542f55534400000000000000000000000000",
-    "ARB": "0x014152422f55534400000000000000000000000000",
-    "ATOM": "0x0141544f4d2f555344000000000000000000000000",
-    "AVAX": "0x01415641582f555344000000000000000000000000",
-    "BCH": "0x014243482f55534400000000000000000000000000",
-    "BNB": "0x01424e422f55534400000000000000000000000000",
-    "BTC": "0x014254432f55534400000000000000000000000000",
-    "DOGE": "0x01444f47452f555344000000000000000000000000",
-    "DOT": "0x01444f542f55534400000000000000000000000000",
-    "ETC": "0x014554432f55534400000000000000000000000000",
-    "ETH": "0x014554482f55534400000000000000000000000000",
-    "FIL": "0x0146494c2f55534400000000000000000000000000",
-    "FLR": "0x01464c522f55534400000000000000000000000000",
-    "FTM": "0x0146544d2f55534400000000000000000000000000",
-    "HBAR": "0x01484241522f555344000000000000000000000000",
-    "ICP": "0x014943502f55534400000000000000000000000000",
-    "LINK": "0x014c494e4b2f555344000000000000000000000000",
-    "LTC": "0x014c54432f55534400000000000000000000000000",
-    "NEAR": "0x014e4541522f555344000000000000000000000000",
-    "QNT": "0x01514e542f55534400000000000000000000000000",
-    "SHIB": "0x01534849422f555344000000000000000000000000",
-    "SOL": "0x01534f4c2f55534400000000000000000000000000",
-    "UNI": "0x01554e492f55534400000000000000000000000000",
-    "USDC": "0x01555344432f555344000000000000000000000000",
-    "USDT": "0x01555344542f555344000000000000000000000000",
-    "XLM": "0x01584c4d2f55534400000000000000000000000000",
-    "XRP": "0x015852502f55534400000000000000000000000000",
-}
-
-ABI_JSON_STRING = '''[
-    {"inputs":[{"internalType":"address","name":"_addressUpdater","type":"address"}],"stateMutability":"nonpayable","type":"constructor"},
-    {"inputs":[],"name":"FTSO_PROTOCOL_ID","outputs":[{"internalType":"uint256","name":"","type":"uint256"}],"stateMutability":"view","type":"function"},
-    {"inputs":[{"internalType":"bytes21","name":"_feedId","type":"bytes21"}],"name":"getFeedById","outputs":[
-        {"internalType":"uint256","name":"","type":"uint256"},
-        {"internalType":"int8","name":"","type":"int8"},
-        {"internalType":"uint64","name":"","type":"uint64"}
-    ],"stateMutability":"payable","type":"function"}
-]'''
-
-ABI = json.loads(ABI_JSON_STRING)
 
-async def fetch_feed_data(symbols: List[str]) -> Dict[str, List[Dict[str, str]]]:
-    ssl_context = ssl.create_default_context(cafile=certifi.where())
-    w3 = AsyncWeb3(AsyncHTTPProvider(RPC_URL))
+async def read_feeds_batched(w3: AsyncWeb3, feed_ids: List[str]) -> List[Optional[Tuple[int, int, int]]]:
+    """
+    Reads every feed in a single eth_call and returns (value, decimals, timestamp) per feed id,
+    or None for a feed that could not be read.
+    Uses a raw FtsoV2 `getFeedsById` call, falling back to a Multicall3 `aggregate3` of `getFeedById` calls.
+    """
+    if not feed_ids:
+        return []
 
-    is_connected = await w3.is_connected()
-    if not is_connected:
-        raise ConnectionError("Failed to connect to the Web3 provider.")
+    try:
+        return await read_feeds_raw(w3, feed_ids)
+    except Exception as e:
+        print(f"⚠️ getFeedsById failed, falling back to Multicall3: {e}")
 
-    ftsov2 = w3.eth.contract(address=w3.to_checksum_address(FTSOV2_ADDRESS), abi=ABI)
+    multicall = w3.eth.contract(address=MULTICALL3_ADDRESS, abi=MULTICALL3_ABI)
+    calls = [(FTSOV2_ADDRESS, True, GET_FEED_BY_ID_CALLDATA[feed_id]) for feed_id in feed_ids]
+    try:
+        results = await multicall.functions.aggregate3(calls).call()
+    except Exception as e:
+        print(f"⚠️ Multicall3 failed, falling back to concurrent getFeedById calls: {e}")
+        return await read_feeds_concurrently(w3, feed_ids)
 
-    results = []
-    for symbol in symbols:
-        feed_id = FEED_IDS.get(symbol)
-        if not feed_id:
+    feeds = []
+    for feed_id, (success, return_data) in zip(feed_ids, results):
+        if not success:
+            print(f"❌ getFeedById reverted for feed {feed_id}")
+            feeds.append(None)
             continue
+        feeds.append(decode_feed(return_data))
+    return feeds
+
+
+async def read_feeds_concurrently(w3: AsyncWeb3, feed_ids: List[str]) -> List[Optional[Tuple[int, int, int]]]:
+    """Last-resort path: one getFeedById per feed, fanned out concurrently. Failed feeds come back as None."""
+    async def read_feed(feed_id):
+        return decode_feed(await eth_call_raw(w3, FTSOV2_ADDRESS, GET_FEED_BY_ID_CALLDATA[feed_id]))
+
+    results = await gather_bounded(read_feed, feed_ids)
+
+    feeds = []
+    for result in results:
+        if not result.ok:
+            print(f"❌ Error fetching feed {result.item}: {result.error}")
+        feeds.append(result.value if result.ok else None)
+    return feeds
+
 
-        feeds, decimals, timestamp = await ftsov2.functions.getFeedById(feed_id).call()
-        real_price = feeds / (10 ** decimals)
-        human_time = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S UTC')
+def format_feed(symbol: str, feed_id: str, value: int, decimals: int, timestamp: int) -> Dict[str, str]:
+    """Converts a raw (value, decimals, timestamp) feed into the JSON entry returned to clients."""
+    real_price = value / (10 ** decimals)
+    human_time = datetime.utcfromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S UTC')
 
-        results.append({
-            "symbol": symbol,
-            "feed_id": feed_id,
-            "price": real_price,
-            "timestamp": human_time
-        })
+    return {
+        "symbol": symbol,
+        "feed_id": feed_id,
+        "price": real_price,
+        "timestamp": human_time
+    }
 
-    return {"feeds": results}
+
+async def read_symbol_feeds(w3: AsyncWeb3, symbols: List[str]) -> List[Tuple[str, str, int, int, int]]:
+    """Returns (symbol, feed_id, value, decimals, timestamp) for every known symbol that could be read."""
+    requested = [(symbol, FEED_IDS[symbol]) for symbol in symbols if symbol in FEED_IDS]
+    feeds = await read_feeds_batched(w3, [feed_id for _, feed_id in requested])
+
+    return [
+        (symbol, feed_id, *feed)
+        for (symbol, feed_id), feed in zip(requested, feeds)
+        if feed is not None
+    ]
+
+
+async def fetch_feed_data(symbols: List[str]) -> Dict[str, List[Dict[str, str]]]:
+    w3 = await web3_pool.get_web3(RPC_URL)
+    feeds = await read_symbol_feeds(w3, symbols)
+    return {"feeds": [format_feed(*feed) for feed in feeds]}
 
 if __name__ == "__main__":
     # Check if symbols were provided as a command-line argument
@@ -100,5 +104,5 @@ if __name__ == "__main__":
     else:
         symbols = []  # or set a default list of symbols
 
-    data = asyncio.run(fetch_feed_data(symbols))
+    data = web3_pool.run(fetch_feed_data(symbols))
     print(json.dumps(data, indent=4))
@@ -0,0 +1,123 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from fetch_ftso_live_prices import RPC_URL, format_feed, read_symbol_feeds
+from registry import FEED_IDS
+from ftso_price_service import FTSO_EPOCH_SECONDS
+import web3_pool
+
+logger = logging.getLogger(__name__)
+
+# How long after an epoch boundary to read, giving the new feed values time to land on-chain
+FTSO_POLL_OFFSET_SECONDS = float(os.getenv("FTSO_POLL_OFFSET_SECONDS", "3"))
+# Backoff between attempts while a fetch fails or the feeds haven't moved yet
+FTSO_RETRY_SECONDS = float(os.getenv("FTSO_RETRY_SECONDS", "5"))
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+class FtsoPoller:
+    """
+    Background poller that reads every feed in `FEED_IDS` once per FTSO voting epoch,
+    scheduled just after the boundary where feed values actually change, and publishes
+    the changed feeds to every subscriber. One upstream read serves any number of clients.
+    """
+
+    def __init__(self, symbols: Optional[List[str]] = None, epoch_seconds: int = FTSO_EPOCH_SECONDS):
+        self.symbols = symbols or list(FEED_IDS.keys())
+        self.epoch_seconds = epoch_seconds
+        self.latest: Dict[str, Dict[str, str]] = {}
+        self._feed_timestamps: Dict[str, int] = {}
+        self._subscribers: List[queue.Queue] = []
+        self._lock = threading.Lock()
+        self._task: Optional[Future] = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """Registers `callback(feeds)` to receive every raw (symbol, feed_id, value, decimals, timestamp) batch."""
+        self._listeners.append(callback)
+
+    def start(self):
+        """Starts polling on the shared web3 event loop (idempotent)."""
+        with self._lock:
+            if self._task is None or self._task.done():
+                self._task = asyncio.run_coroutine_threadsafe(self._run(), web3_pool.pool.loop)
+                logger.info(f"FTSO poller started for {len(self.symbols)} feeds")
+
+    def stop(self):
+        with self._lock:
+            if self._task is not None:
+                self._task.cancel()
+                self._task = None
+
+    def subscribe(self) -> Tuple[queue.Queue, Dict[str, Dict[str, str]]]:
+        """Returns a queue of changed-feed batches plus a snapshot of the current feeds."""
+        q = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            self._subscribers.append(q)
+            snapshot = dict(self.latest)
+        self.start()
+        return q, snapshot
+
+    def unsubscribe(self, q: queue.Queue):
+        with self._lock:
+            if q in self._subscribers:
+                self._subscribers.remove(q)
+
+    def _next_poll_at(self, now: float) -> float:
+        return (now // self.epoch_seconds + 1) * self.epoch_seconds + FTSO_POLL_OFFSET_SECONDS
+
+    async def _run(self):
+        while True:
+            try:
+                changed = await self._poll_once()
+            except Exception as e:
+                logger.error(f"FTSO poll failed: {e}")
+                changed = None
+
+            now = time.time()
+            if changed:
+                delay = self._next_poll_at(now) - now
+            else:
+                # Nothing new yet (or the read failed): retry shortly instead of waiting a whole epoch
+                delay = FTSO_RETRY_SECONDS
+            await asyncio.sleep(delay)
+
+    async def _poll_once(self) -> List[Dict[str, str]]:
+        w3 = await web3_pool.get_web3(RPC_URL)
+        feeds = await read_symbol_feeds(w3, self.symbols)
+
+        for listener in self._listeners:
+            listener(feeds)
+
+        changed = []
+        for symbol, feed_id, value, decimals, timestamp in feeds:
+            if self._feed_timestamps.get(symbol) == timestamp:
+                continue
+            self._feed_timestamps[symbol] = timestamp
+            changed.append(format_feed(symbol, feed_id, value, decimals, timestamp))
+
+        if changed:
+            self._publish(changed)
+        return changed
+
+    def _publish(self, changed: List[Dict[str, str]]):
+        with self._lock:
+            for entry in changed:
+                self.latest[entry["symbol"]] = entry
+            subscribers = list(self._subscribers)
+
+        for q in subscribers:
+            try:
+                q.put_nowait(changed)
+            except queue.Full:
+                # Slow client: drop its oldest batch rather than block the poller
+                try:
+                    q.get_nowait()
+                except queue.Empty:
+                    pass
+                q.put_nowait(changed)
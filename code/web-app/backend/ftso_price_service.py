@@ -0,0 +1,64 @@
+import os
+import time
+import logging
+import threading
+from typing import Dict, List, Tuple
+from fetch_ftso_live_prices import RPC_URL, format_feed, read_symbol_feeds
+from registry import FEED_IDS
+import web3_pool
+
+logger = logging.getLogger(__name__)
+
+# FTSO voting epoch length; feeds don't change between epoch boundaries
+FTSO_EPOCH_SECONDS = int(os.getenv("FTSO_EPOCH_SECONDS", "90"))
+# Minimum time an entry stays cached, so a lagging feed doesn't trigger a fetch on every request
+FTSO_MIN_TTL_SECONDS = float(os.getenv("FTSO_MIN_TTL_SECONDS", "5"))
+
+
+class FtsoPriceService:
+    """
+    In-process FTSO price reader with a TTL cache keyed on each feed's own timestamp.
+    A cached entry stays valid until the end of the voting epoch its timestamp falls in,
+    so repeated requests within an epoch are served without touching the RPC.
+    """
+
+    def __init__(self, epoch_seconds: int = FTSO_EPOCH_SECONDS, min_ttl: float = FTSO_MIN_TTL_SECONDS):
+        self.epoch_seconds = epoch_seconds
+        self.min_ttl = min_ttl
+        self._cache: Dict[str, Tuple[Dict[str, str], int, float]] = {}  # symbol -> (entry, feed timestamp, expires at)
+        self._cache_lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def _expires_at(self, feed_timestamp: int, now: float) -> float:
+        epoch_end = (feed_timestamp // self.epoch_seconds + 1) * self.epoch_seconds
+        return max(epoch_end, now + self.min_ttl)
+
+    def _missing(self, symbols: List[str], now: float) -> List[str]:
+        with self._cache_lock:
+            return [s for s in symbols if s not in self._cache or self._cache[s][2] <= now]
+
+    def store(self, feeds: List[Tuple[str, str, int, int, int]]):
+        """Caches raw (symbol, feed_id, value, decimals, timestamp) feeds read elsewhere."""
+        now = time.time()
+        with self._cache_lock:
+            for symbol, feed_id, value, decimals, timestamp in feeds:
+                entry = format_feed(symbol, feed_id, value, decimals, timestamp)
+                self._cache[symbol] = (entry, timestamp, self._expires_at(timestamp, now))
+
+    async def _read(self, symbols: List[str]) -> List[Tuple[str, str, int, int, int]]:
+        w3 = await web3_pool.get_web3(RPC_URL)
+        return await read_symbol_feeds(w3, symbols)
+
+    def get_prices(self, symbols: List[str]) -> Dict[str, List[Dict[str, str]]]:
+        """Returns `{"feeds": [...]}` for the requested symbols, reading only stale or uncached feeds."""
+        symbols = [s for s in symbols if s in FEED_IDS]
+        if self._missing(symbols, time.time()):
+            # Only one thread refreshes at a time; the others pick up its results from the cache
+            with self._fetch_lock:
+                missing = self._missing(symbols, time.time())
+                if missing:
+                    logger.info(f"FTSO cache miss for {missing}")
+                    self.store(web3_pool.run(self._read(missing)))
+
+        with self._cache_lock:
+            return {"feeds": [self._cache[s][0] for s in symbols if s in self._cache]}
@@ -0,0 +1,188 @@
+import os
+import calendar
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from rollups import rollup_for, table
+
+# Bucket widths (seconds) for OHLC history; each is served from the coarsest rollup that divides it
+RESOLUTIONS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "4h": 14400, "1d": 86400}
+HISTORY_MAX_LIMIT = int(os.getenv("HISTORY_MAX_LIMIT", "10000"))
+
+RAW_COLUMNS = "symbol, price, uniswap_liquidity, curve_liquidity, timestamp"
+# market_data stores a symbol id; the symbols dimension table maps it back to the name
+SOURCE = "market_data m JOIN symbols s ON s.id = m.symbol_id"
+SOURCE_COLUMNS = "s.symbol, m.price, m.uniswap_liquidity, m.curve_liquidity, m.timestamp"
+
+
+class HistoryQuery(NamedTuple):
+    start: Optional[datetime]
+    end: Optional[datetime]
+    limit: Optional[int]  # None = unbounded (streaming responses only)
+    resolution: Optional[str]
+
+
+def parse_time(value: str) -> datetime:
+    """
+    Accepts unix seconds or an ISO-8601 date/datetime; returns naive UTC to match the TIMESTAMP column.
+    Raises ValueError for anything unparseable, including out-of-range numbers like `inf` or `1e20`.
+    """
+    try:
+        seconds = float(value)
+    except ValueError:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        if parsed.tzinfo is not None:
+            parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+        return parsed
+
+    try:
+        return datetime.fromtimestamp(seconds, tz=timezone.utc).replace(tzinfo=None)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f"Timestamp out of range: {value}") from None
+
+
+def parse_history_args(args, streaming: bool = False) -> HistoryQuery:
+    """
+    Reads `from`, `to`, `limit` and `resolution` from the request query string.
+    Streaming responses have flat memory use, so they are unbounded unless a limit is given;
+    other responses return at most HISTORY_MAX_LIMIT rows and flag when they were cut off.
+    Raises ValueError on malformed values.
+    """
+    start = parse_time(args["from"]) if args.get("from") else None
+    end = parse_time(args["to"]) if args.get("to") else None
+    if start and end and start >= end:
+        raise ValueError("`from` must be before `to`.")
+
+    if streaming:
+        limit = int(args["limit"]) if args.get("limit") else None
+        if limit is not None and limit <= 0:
+            raise ValueError("`limit` must be positive.")
+    else:
+        limit = int(args.get("limit", HISTORY_MAX_LIMIT))
+        if not 0 < limit <= HISTORY_MAX_LIMIT:
+            raise ValueError(f"`limit` must be between 1 and {HISTORY_MAX_LIMIT}.")
+
+    resolution = args.get("resolution") or None
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise ValueError(f"`resolution` must be one of {', '.join(RESOLUTIONS)}.")
+
+    return HistoryQuery(start, end, limit, resolution)
+
+
+def _filters(symbols: Optional[Sequence[str]], query: HistoryQuery, rollup: bool = False) -> Tuple[str, List]:
+    clauses, params = [], []
+    if symbols:
+        clauses.append(f"s.symbol IN ({', '.join(['%s'] * len(symbols))})")
+        params.extend(symbols)
+    # Rollup buckets are unix seconds; raw rows are compared as naive UTC TIMESTAMPs
+    column = "r.bucket" if rollup else "m.timestamp"
+    if query.start:
+        clauses.append(f"{column} >= %s")
+        params.append(calendar.timegm(query.start.timetuple()) if rollup else query.start)
+    if query.end:
+        clauses.append(f"{column} < %s")
+        params.append(calendar.timegm(query.end.timetuple()) if rollup else query.end)
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def build_history_sql(symbols: Optional[Sequence[str]], query: HistoryQuery, newest_first: bool = False) -> Tuple[str, List]:
+    """
+    SQL (and parameters) for the most recent `query.limit` rows or buckets of `symbols`
+    (all symbols if None) within the time range, returned oldest first unless `newest_first`.
+    With a resolution the rows are OHLC buckets read from the rollup tables.
+    """
+    where, params = _filters(symbols, query)
+    order = "DESC" if newest_first else "ASC"
+
+    if query.resolution is None and query.limit is None:
+        sql = f"""
+            SELECT {SOURCE_COLUMNS}
+            FROM {SOURCE}
+            {where}
+            ORDER BY m.timestamp {order}
+        """
+        return sql, params
+
+    if query.resolution is None:
+        sql = f"""
+            SELECT {RAW_COLUMNS} FROM (
+                SELECT {SOURCE_COLUMNS}
+                FROM {SOURCE}
+                {where}
+                ORDER BY m.timestamp DESC
+                LIMIT %s
+            ) AS recent
+            ORDER BY timestamp {order}
+        """
+        return sql, params + [query.limit]
+
+    return _build_rollup_sql(symbols, query, order)
+
+
+def _build_rollup_sql(symbols: Optional[Sequence[str]], query: HistoryQuery, order: str) -> Tuple[str, List]:
+    """OHLC buckets read from the coarsest rollup table, merged further when the resolution is wider."""
+    seconds = RESOLUTIONS[query.resolution]
+    name, width = rollup_for(seconds)
+    where, params = _filters(symbols, query, rollup=True)
+    limit = "LIMIT %s" if query.limit is not None else ""
+    limit_params = [query.limit] if query.limit is not None else []
+
+    if width == seconds:
+        inner = f"""
+            SELECT s.symbol, r.bucket AS period, r.open, r.high, r.low, r.close,
+                   r.uniswap_liquidity, r.curve_liquidity
+            FROM {table(name)} r JOIN symbols s ON s.id = r.symbol_id
+            {where}
+            ORDER BY r.bucket DESC
+            {limit}
+        """
+        inner_params = params
+    else:
+        # open/close (and the latest liquidity) are the first element of an ordered GROUP_CONCAT
+        inner = f"""
+            SELECT s.symbol,
+                   r.bucket DIV %s * %s AS period,
+                   CAST(SUBSTRING_INDEX(GROUP_CONCAT(r.open ORDER BY r.bucket ASC), ',', 1) AS DECIMAL(18,8)) AS open,
+                   MAX(r.high) AS high,
+                   MIN(r.low) AS low,
+                   CAST(SUBSTRING_INDEX(GROUP_CONCAT(r.close ORDER BY r.bucket DESC), ',', 1) AS DECIMAL(18,8)) AS close,
+                   CAST(SUBSTRING_INDEX(GROUP_CONCAT(r.uniswap_liquidity ORDER BY r.bucket DESC), ',', 1) AS DECIMAL(30,8)) AS uniswap_liquidity,
+                   CAST(SUBSTRING_INDEX(GROUP_CONCAT(r.curve_liquidity ORDER BY r.bucket DESC), ',', 1) AS DECIMAL(30,8)) AS curve_liquidity
+            FROM {table(name)} r JOIN symbols s ON s.id = r.symbol_id
+            {where}
+            GROUP BY s.symbol, period
+            ORDER BY period DESC
+            {limit}
+        """
+        inner_params = [seconds, seconds] + params
+
+    sql = f"""
+        SELECT symbol, FROM_UNIXTIME(period) AS timestamp,
+               open, high, low, close, close AS price,
+               uniswap_liquidity, curve_liquidity
+        FROM ({inner}) AS buckets
+        ORDER BY period {order}, symbol
+    """
+    return sql, inner_params + limit_params
+
+
+def fetch_history(cur, symbols: Optional[Sequence[str]], query: HistoryQuery,
+                  newest_first: bool = False) -> Tuple[List[Dict], Optional[int]]:
+    """
+    Runs the history query on `cur` and returns `(rows, next_to)`. One row past `query.limit` is
+    fetched to tell whether older rows were cut off; if so `next_to` is the unix-second timestamp
+    to pass as `to` for the next (older) page, otherwise None. When the page ends partway through
+    a timestamp, that timestamp is left whole for the next page (unless it fills the page).
+    """
+    if query.limit is None:
+        cur.execute(*build_history_sql(symbols, query, newest_first))
+        return cur.fetchall(), None
+
+    cur.execute(*build_history_sql(symbols, query._replace(limit=query.limit + 1), newest_first))
+    rows = cur.fetchall()
+    if len(rows) <= query.limit:
+        return rows, None
+
+    rows = rows[:query.limit] if newest_first else rows[1:]
+    oldest = rows[-1]["timestamp"] if newest_first else rows[0]["timestamp"]
+    complete = [row for row in rows if row["timestamp"] != oldest]
+    return (complete or rows), calendar.timegm(oldest.timetuple())
@@ -0,0 +1,191 @@
+import os
+import csv
+import time
+import argparse
+import logging
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+import db
+import rollups
+from history_queries import parse_time
+
+logger = logging.getLogger(__name__)
+
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "5000"))  # rows per executemany / commit
+
+# Column ranges (DECIMAL(18,8) / DECIMAL(30,8)); out-of-range live ticks are rejected up front
+# rather than failing a whole batched insert
+MAX_PRICE = 10 ** 10
+MAX_LIQUIDITY = 10 ** 22
+MAX_SYMBOL_LENGTH = 10  # symbols.symbol VARCHAR(10), including the USDT suffix
+# TIMESTAMP column range
+MIN_TIMESTAMP = datetime(1970, 1, 1, 0, 0, 1)
+MAX_TIMESTAMP = datetime(2038, 1, 19, 3, 14, 7)
+
+# Idempotent on the (symbol, timestamp) unique key: re-loading a row overwrites it instead of duplicating it.
+# A NULL liquidity in the new row keeps whatever liquidity is already stored.
+UPSERT_MARKET_DATA = """
+    INSERT INTO market_data (symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        price = VALUES(price),
+        uniswap_liquidity = COALESCE(VALUES(uniswap_liquidity), uniswap_liquidity),
+        curve_liquidity = COALESCE(VALUES(curve_liquidity), curve_liquidity)
+"""
+
+# Only moves forward: an older row (e.g. from a backfill) never replaces a newer snapshot
+UPSERT_MARKET_LATEST = """
+    INSERT INTO market_latest (symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp)
+    VALUES (%s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        price = IF(VALUES(timestamp) >= timestamp, VALUES(price), price),
+        uniswap_liquidity = IF(VALUES(timestamp) >= timestamp, COALESCE(VALUES(uniswap_liquidity), uniswap_liquidity), uniswap_liquidity),
+        curve_liquidity = IF(VALUES(timestamp) >= timestamp, COALESCE(VALUES(curve_liquidity), curve_liquidity), curve_liquidity),
+        timestamp = GREATEST(timestamp, VALUES(timestamp))
+"""
+
+
+class MarketRow(NamedTuple):
+    symbol: str
+    price: float
+    timestamp: datetime
+    uniswap_liquidity: Optional[float] = None
+    curve_liquidity: Optional[float] = None
+
+
+def feed_row(symbol: str, value: int, decimals: int, timestamp: int) -> MarketRow:
+    """market_data row for a raw FTSO feed reading (`BTC` is stored as `BTCUSDT`, like the CSV history)."""
+    ts = datetime.fromtimestamp(timestamp, tz=timezone.utc).replace(tzinfo=None)
+    return MarketRow(symbol + "USDT", value / (10 ** decimals), ts)
+
+
+def tick_row(tick: Dict) -> MarketRow:
+    """
+    market_data row for a live tick `{"symbol", "price", "timestamp"?, "uniswap_liquidity"?, "curve_liquidity"?}`;
+    the timestamp (unix seconds or ISO-8601) defaults to now. Raises KeyError/TypeError/ValueError on bad input.
+    """
+    if not isinstance(tick, dict):
+        raise TypeError(f"Tick must be an object, got {type(tick).__name__}")
+    symbol = tick["symbol"]
+    if not isinstance(symbol, str):
+        raise TypeError(f"Symbol must be a string, got {type(symbol).__name__}")
+    symbol = symbol.strip().upper()
+    if not symbol.endswith("USDT"):
+        symbol += "USDT"
+    if not len("USDT") < len(symbol) <= MAX_SYMBOL_LENGTH:
+        raise ValueError(f"Invalid symbol {symbol!r}: must be 1-{MAX_SYMBOL_LENGTH - len('USDT')} characters plus USDT")
+    price = float(tick["price"])
+    if not 0 < price < MAX_PRICE:
+        raise ValueError(f"Invalid price for {symbol}: {price}")
+    ts = parse_time(str(tick["timestamp"])) if tick.get("timestamp") is not None else datetime.utcnow().replace(microsecond=0)
+    if not MIN_TIMESTAMP <= ts <= MAX_TIMESTAMP:
+        raise ValueError(f"Invalid timestamp for {symbol}: {ts.isoformat()} is outside {MIN_TIMESTAMP} - {MAX_TIMESTAMP}")
+
+    liquidity = []
+    for key in ("uniswap_liquidity", "curve_liquidity"):
+        value = float(tick[key]) if tick.get(key) is not None else None
+        if value is not None and not 0 <= value < MAX_LIQUIDITY:
+            raise ValueError(f"Invalid {key} for {symbol}: {value}")
+        liquidity.append(value)
+    return MarketRow(symbol, price, ts, *liquidity)
+
+
+_symbol_ids: Dict[str, int] = {}  # symbol -> symbols.id; ids never change once assigned
+
+
+def symbol_ids(conn, symbols: Iterable[str]) -> Dict[str, int]:
+    """Ids of `symbols` in the symbols dimension table, registering (and committing) any new ones."""
+    missing = sorted(set(symbols) - _symbol_ids.keys())
+    if missing:
+        cur = conn.cursor()
+        try:
+            cur.executemany("INSERT IGNORE INTO symbols (symbol) VALUES (%s)", [(symbol,) for symbol in missing])
+            conn.commit()
+            cur.execute(f"SELECT symbol, id FROM symbols WHERE symbol IN ({', '.join(['%s'] * len(missing))})", missing)
+            _symbol_ids.update(cur.fetchall())
+        finally:
+            cur.close()
+    return _symbol_ids
+
+
+def newest_per_symbol(rows: Iterable[tuple]) -> List[tuple]:
+    """The newest of each symbol's (symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp) rows."""
+    newest = {}
+    for row in rows:
+        if row[0] not in newest or row[4] >= newest[row[0]][4]:
+            newest[row[0]] = row
+    return list(newest.values())
+
+
+def upsert_market_rows(rows: Iterable[MarketRow], batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """
+    Upserts rows into market_data (folding them into the rollup and latest-snapshot tables) in `batch_size` multi-row
+    INSERTs, committing after each batch so arbitrarily large inputs never build one huge transaction.
+    Returns the number of rows written.
+    """
+    rows = iter(rows)
+    written = 0
+    with db.connection() as conn:
+        cur = conn.cursor()
+        try:
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                ids = symbol_ids(conn, {r.symbol for r in batch})
+                batch = [(ids[r.symbol], r.price, r.uniswap_liquidity, r.curve_liquidity, r.timestamp) for r in batch]
+                cur.executemany(UPSERT_MARKET_DATA, batch)  # rewritten into a single multi-row INSERT
+                rollups.update_rollups(cur, batch)
+                cur.executemany(UPSERT_MARKET_LATEST, newest_per_symbol(batch))
+                conn.commit()
+                written += len(batch)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+    return written
+
+
+def melt_csv(path: str) -> Iterator[MarketRow]:
+    """
+    Reads a wide `date,BTCUSDT,ETHUSDT,...` price CSV as long rows, one per non-empty cell.
+    Empty and zero cells mean "no price that day" and are skipped.
+    """
+    with open(path, "r", newline="") as file:
+        reader = csv.reader(file)
+        headers = next(reader)
+        symbols = headers[1:]  # Skip the date column
+
+        for row in reader:
+            date = datetime.fromisoformat(row[0])
+            for symbol, cell in zip(symbols, row[1:]):
+                if not cell:
+                    continue
+                price = float(cell)
+                if price:
+                    yield MarketRow(symbol, price, date)
+
+
+def import_csv(path: str, batch_size: int = INGEST_BATCH_SIZE) -> int:
+    """Bulk-loads a wide price CSV into market_data; safe to re-run."""
+    started = time.perf_counter()
+    written = upsert_market_rows(melt_csv(path), batch_size)
+    elapsed = time.perf_counter() - started
+    logger.info(f"Imported {written} rows from {path} in {elapsed:.2f}s ({written / max(elapsed, 1e-9):.0f} rows/s).")
+    return written
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Bulk-load a wide price CSV into market_data.")
+    parser.add_argument("path", nargs="?", default="historical_data.csv")
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    args = parser.parse_args()
+
+    import_csv(args.path, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import os
+import time
+import queue
+import atexit
+import logging
+import threading
+from typing import Callable, Iterable, List, Optional, Tuple
+from db import is_transient
+from ingest import MarketRow, upsert_market_rows
+
+logger = logging.getLogger(__name__)
+
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))  # ticks buffered before producers block
+INGEST_FLUSH_ROWS = int(os.getenv("INGEST_FLUSH_ROWS", "500"))
+INGEST_FLUSH_MS = float(os.getenv("INGEST_FLUSH_MS", "1000"))
+INGEST_PUT_TIMEOUT = float(os.getenv("INGEST_PUT_TIMEOUT", "5"))
+INGEST_RETRY_SECONDS = float(os.getenv("INGEST_RETRY_SECONDS", "5"))
+
+_STOP = object()
+
+
+class _RowQueue(queue.Queue):
+    """Bounded queue that can also take a whole batch atomically."""
+
+    def put_all(self, items: List, timeout: Optional[float] = None):
+        """
+        Queues every item or none: waits up to `timeout` (0 = not at all) for room for the whole
+        batch, then raises queue.Full without queueing anything. Raises ValueError if the batch
+        could never fit.
+        """
+        if len(items) > self.maxsize > 0:
+            raise ValueError(f"Batch of {len(items)} rows exceeds the ingest queue size ({self.maxsize})")
+        deadline = time.monotonic() + timeout if timeout else None
+        with self.not_full:
+            while self.maxsize > 0 and self.maxsize - self._qsize() < len(items):
+                remaining = deadline - time.monotonic() if deadline is not None else 0
+                if timeout is not None and remaining <= 0:
+                    raise queue.Full
+                self.not_full.wait(remaining if timeout is not None else None)
+            for item in items:
+                self._put(item)
+            self.unfinished_tasks += len(items)
+            self.not_empty.notify()
+
+
+class BatchWriter:
+    """
+    Write-behind writer for live ticks. Producers `put` rows on a bounded queue and return at once;
+    one background thread drains it and writes a multi-row upsert every `flush_rows` rows or
+    `flush_ms` milliseconds, whichever comes first. When the database falls behind the queue fills
+    and producers block (then get queue.Full) instead of memory growing without bound.
+    Connection failures are retried with the same batch; a batch the database rejects is split
+    until the offending rows are isolated, and those rows are logged and dropped.
+    """
+
+    def __init__(self, write: Callable[[List[MarketRow]], int] = upsert_market_rows,
+                 flush_rows: int = INGEST_FLUSH_ROWS, flush_ms: float = INGEST_FLUSH_MS,
+                 queue_size: int = INGEST_QUEUE_SIZE):
+        self.write = write
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_ms / 1000
+        self.written = 0
+        self.dropped = 0
+        self._queue = _RowQueue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
+
+    def start(self):
+        """Starts the writer thread (idempotent)."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="ingest-writer", daemon=True)
+                self._thread.start()
+                logger.info(f"Ingest writer started (flush every {self.flush_rows} rows / {self.flush_seconds * 1000:.0f}ms)")
+
+    def put(self, row: MarketRow, timeout: Optional[float] = INGEST_PUT_TIMEOUT):
+        """Queues one row, blocking up to `timeout` (0 = not at all) while the queue is full."""
+        self.start()
+        if timeout == 0:
+            self._queue.put_nowait(row)
+        else:
+            self._queue.put(row, timeout=timeout)
+
+    def put_many(self, rows: Iterable[MarketRow], timeout: Optional[float] = INGEST_PUT_TIMEOUT) -> int:
+        """
+        Queues rows in order, all or nothing: raises queue.Full (having queued none of them) if the
+        writer stays saturated past `timeout`, so callers can safely retry the whole batch.
+        """
+        rows = list(rows)
+        self.start()
+        self._queue.put_all(rows, timeout)
+        return len(rows)
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout: float = 10):
+        """Flushes everything queued so far and stops the writer thread."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            # The writer keeps draining while we wait, so a full queue normally frees a slot quickly
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            logger.error(f"Ingest writer did not drain in {timeout}s; abandoning {self.pending} queued rows")
+            return
+        thread.join(max(0, deadline - time.monotonic()))
+
+    def _next_batch(self) -> Tuple[List[MarketRow], bool]:
+        """Blocks for the first row, then collects until the batch is full or the flush interval ends."""
+        first = self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.flush_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                row = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if row is _STOP:
+                return batch, True
+            batch.append(row)
+        return batch, False
+
+    def _flush(self, batch: List[MarketRow]):
+        # Keep retrying while the database is unreachable: the queue fills and pushes back on producers
+        while True:
+            try:
+                self.written += self.write(batch)
+                return
+            except Exception as e:
+                if not is_transient(e):
+                    self._isolate(batch, e)
+                    return
+                logger.error(f"Ingest flush of {len(batch)} rows failed, retrying in {INGEST_RETRY_SECONDS}s: {e}")
+                time.sleep(INGEST_RETRY_SECONDS)
+
+    def _isolate(self, batch: List[MarketRow], error: Exception):
+        """Bisects a batch the database rejected, writing the good rows and dropping the bad ones."""
+        if len(batch) == 1:
+            self.dropped += 1
+            logger.error(f"Dropping ingest row the database rejected: {batch[0]} ({error})")
+            return
+        middle = len(batch) // 2
+        for half in (batch[:middle], batch[middle:]):
+            self._flush(half)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._flush(batch)
+        logger.info(f"Ingest writer stopped after writing {self.written} rows ({self.dropped} dropped)")
@@ -0,0 +1,161 @@
+import os
+import time
+import uuid
+import logging
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import CancelledError, Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("QAOA_JOB_WORKERS", "2"))
+JOB_HISTORY = int(os.getenv("QAOA_JOB_HISTORY", "100"))  # finished jobs kept for polling
+
+STAGES = ["graph", "qubo", "optimise", "execute"]
+
+
+class JobCancelled(Exception):
+    """Raised inside a worker at the next stage boundary after its job was cancelled."""
+
+
+def _run_job(fn: Callable, job_id: str, stages, cancel_flags) -> Any:
+    """Worker-side entry point: runs `fn(progress=...)`, reporting stages and honouring cancellation."""
+    def progress(stage: str):
+        if cancel_flags.get(job_id):
+            raise JobCancelled(f"Job {job_id} cancelled before {stage}")
+        stages[job_id] = stage
+
+    return fn(progress=progress)
+
+
+class Job:
+    def __init__(self, job_id: str, key: str, future: Future):
+        self.id = job_id
+        self.key = key
+        self.future = future
+        self.created_at = time.time()
+        self.cancel_requested = False
+
+
+class JobManager:
+    """
+    Runs solver jobs in a bounded process pool so Flask request threads never block on a solve.
+    Identical concurrent requests (same `key`) are coalesced onto the one job already in flight.
+    Workers report their current stage through a shared dict and check a cancel flag between stages.
+    If a worker dies the pool is broken for good, so it is replaced on the next submit.
+    """
+
+    def __init__(self, fn: Callable, max_workers: int = JOB_WORKERS):
+        self.fn = fn
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._stages = None
+        self._cancel_flags = None
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._active: Dict[str, str] = {}  # coalescing key -> job id
+        self._lock = threading.Lock()
+
+    def _start(self):
+        if self._executor is None:
+            # spawn, not fork: the parent runs event-loop and DB threads that must not be copied mid-flight
+            context = multiprocessing.get_context("spawn")
+            self._manager = context.Manager()
+            self._stages = self._manager.dict()
+            self._cancel_flags = self._manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            logger.info(f"Started job pool with {self.max_workers} workers")
+
+    def _replace_broken_pool(self):
+        """Fails the jobs stranded on a crashed pool and starts a fresh one (caller holds the lock)."""
+        logger.error("Job pool is broken (a worker process died); restarting it")
+        for job in self._jobs.values():
+            if not job.future.done():
+                try:
+                    job.future.set_exception(BrokenProcessPool("Worker process died while the job was running"))
+                except InvalidStateError:
+                    pass  # the executor failed it first
+        self._executor.shutdown(wait=False)
+        self._executor = None
+        self._start()
+
+    def submit(self, key: str = "default") -> Dict[str, Any]:
+        """Starts a job, or returns the running one with the same key."""
+        with self._lock:
+            active_id = self._active.get(key)
+            if active_id is not None and not self._jobs[active_id].future.done():
+                return self._describe(self._jobs[active_id])
+
+            self._start()
+            job_id = uuid.uuid4().hex
+            try:
+                future = self._executor.submit(_run_job, self.fn, job_id, self._stages, self._cancel_flags)
+            except BrokenProcessPool:
+                self._replace_broken_pool()
+                future = self._executor.submit(_run_job, self.fn, job_id, self._stages, self._cancel_flags)
+            job = Job(job_id, key, future)
+            self._jobs[job_id] = job
+            self._active[key] = job_id
+            self._prune()
+
+        logger.info(f"Submitted job {job_id} ({key})")
+        return self._describe(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self._jobs.get(job_id)
+        return self._describe(job) if job else None
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancels a queued job immediately, or a running one at its next stage boundary."""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        job.cancel_requested = True
+        if not job.future.cancel() and not job.future.done():
+            self._cancel_flags[job_id] = True
+        return self._describe(job)
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Blocks until the job finishes (or `timeout` passes) and returns its description."""
+        job = self._jobs[job_id]
+        try:
+            job.future.result(timeout)
+        except Exception:
+            pass
+        return self._describe(job)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.future.done()]
+        for job_id in finished[:max(0, len(self._jobs) - JOB_HISTORY)]:
+            del self._jobs[job_id]
+            self._stages.pop(job_id, None)
+            self._cancel_flags.pop(job_id, None)
+
+    def _describe(self, job: Job) -> Dict[str, Any]:
+        stage = self._stages.get(job.id) if self._stages is not None else None
+        info = {
+            "job_id": job.id,
+            "key": job.key,
+            "created_at": job.created_at,
+            "stage": stage,
+            "stages": STAGES,
+        }
+
+        future = job.future
+        if not future.done():
+            info["status"] = "cancelling" if job.cancel_requested else ("running" if stage else "queued")
+            return info
+
+        try:
+            info["result"] = future.result()
+            info["status"] = "succeeded"
+        except (CancelledError, JobCancelled):
+            info["status"] = "cancelled"
+        except Exception as e:
+            info["status"] = "failed"
+            info["error"] = str(e)
+        return info
@@ -0,0 +1,219 @@
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Callable, List, Tuple
+import db
+import rollups
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_LOCK = "market_data_migrations"
+MIGRATION_LOCK_TIMEOUT = int(os.getenv("MIGRATION_LOCK_TIMEOUT", "300"))  # other app workers wait for the first to finish
+
+# market_data is range-partitioned by year; rows past the last year land in `pmax`
+PARTITION_FIRST_YEAR = 2020
+PARTITION_LAST_YEAR = 2030
+
+
+def _index_exists(cur, table: str, index: str) -> bool:
+    cur.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index))
+    return cur.fetchone()["count"] > 0
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute("""
+        SELECT COUNT(*) AS count FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cur.fetchone()["count"] > 0
+
+
+def _yearly_partitions() -> str:
+    # Boundaries are literal epoch seconds so they do not depend on the session time zone
+    partitions = []
+    for year in range(PARTITION_FIRST_YEAR, PARTITION_LAST_YEAR + 1):
+        boundary = int(datetime(year + 1, 1, 1, tzinfo=timezone.utc).timestamp())
+        partitions.append(f"PARTITION p{year} VALUES LESS THAN ({boundary})")
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return ",\n".join(partitions)
+
+
+def create_market_data(cur):
+    """The original table, as created by earlier versions of the app."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS market_data (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            symbol VARCHAR(10) NOT NULL,
+            price DECIMAL(18,8) NOT NULL,
+            uniswap_liquidity DECIMAL(30,8),
+            curve_liquidity DECIMAL(30,8),
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+
+def add_symbol_timestamp_key(cur):
+    """Drops duplicate (symbol, timestamp) rows, keeping the first, then makes the pair unique."""
+    if _index_exists(cur, "market_data", "uniq_symbol_timestamp"):
+        return
+    cur.execute("""
+        DELETE newer FROM market_data newer
+        JOIN market_data older
+          ON newer.symbol = older.symbol AND newer.timestamp = older.timestamp AND newer.id > older.id
+    """)
+    logger.info(f"Removed {cur.rowcount} duplicate market_data rows.")
+    cur.execute("ALTER TABLE market_data ADD UNIQUE KEY uniq_symbol_timestamp (symbol, timestamp)")
+
+
+def create_symbols(cur):
+    """Symbols dimension table, seeded from the symbols already stored."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            id SMALLINT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+            symbol VARCHAR(10) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY uniq_symbol (symbol)
+        )
+    """)
+    cur.execute("INSERT IGNORE INTO symbols (symbol) SELECT DISTINCT symbol FROM market_data")
+
+
+def partition_market_data(cur):
+    """
+    Rebuilds market_data keyed by symbol id and range-partitioned by year. Per-symbol history is a
+    (symbol_id, timestamp) index range scan, all-symbol history walks the timestamp index, and
+    time-bounded queries only touch the partitions they overlap.
+    """
+    if _column_exists(cur, "market_data", "symbol_id"):
+        # Interrupted after the swap: only the old copy is left to drop
+        cur.execute("DROP TABLE IF EXISTS market_data_v3")
+        return
+
+    cur.execute("DROP TABLE IF EXISTS market_data_v4")
+    cur.execute(f"""
+        CREATE TABLE market_data_v4 (
+            id BIGINT UNSIGNED NOT NULL AUTO_INCREMENT,
+            symbol_id SMALLINT UNSIGNED NOT NULL,
+            price DECIMAL(18,8) NOT NULL,
+            uniswap_liquidity DECIMAL(30,8),
+            curve_liquidity DECIMAL(30,8),
+            timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, timestamp),
+            UNIQUE KEY uniq_symbol_timestamp (symbol_id, timestamp),
+            KEY idx_timestamp (timestamp)
+        )
+        PARTITION BY RANGE (UNIX_TIMESTAMP(timestamp)) (
+            {_yearly_partitions()}
+        )
+    """)
+    cur.execute("""
+        INSERT INTO market_data_v4 (id, symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp)
+        SELECT m.id, s.id, m.price, m.uniswap_liquidity, m.curve_liquidity, m.timestamp
+        FROM market_data m
+        JOIN symbols s ON s.symbol = m.symbol
+        WHERE m.timestamp IS NOT NULL
+    """)
+    logger.info(f"Copied {cur.rowcount} rows into the partitioned market_data.")
+    cur.execute("RENAME TABLE market_data TO market_data_v3, market_data_v4 TO market_data")
+    cur.execute("DROP TABLE market_data_v3")
+
+
+def create_rollups(cur):
+    """OHLC + liquidity rollup tables, one row per (symbol, bucket), built from the rows already stored."""
+    for name in rollups.ROLLUPS:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {rollups.table(name)} (
+                symbol_id SMALLINT UNSIGNED NOT NULL,
+                bucket INT UNSIGNED NOT NULL,
+                open DECIMAL(18,8) NOT NULL,
+                high DECIMAL(18,8) NOT NULL,
+                low DECIMAL(18,8) NOT NULL,
+                close DECIMAL(18,8) NOT NULL,
+                first_ts TIMESTAMP NOT NULL,
+                last_ts TIMESTAMP NOT NULL,
+                uniswap_liquidity DECIMAL(30,8),
+                curve_liquidity DECIMAL(30,8),
+                PRIMARY KEY (symbol_id, bucket),
+                KEY idx_bucket (bucket)
+            )
+        """)
+        cur.execute(rollups.backfill_sql(name))
+        logger.info(f"Built {rollups.table(name)} ({cur.rowcount} rows).")
+
+
+def create_market_latest(cur):
+    """One row per symbol holding its most recent price, liquidity and timestamp."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS market_latest (
+            symbol_id SMALLINT UNSIGNED PRIMARY KEY,
+            price DECIMAL(18,8) NOT NULL,
+            uniswap_liquidity DECIMAL(30,8),
+            curve_liquidity DECIMAL(30,8),
+            timestamp TIMESTAMP NOT NULL
+        )
+    """)
+    cur.execute("""
+        REPLACE INTO market_latest (symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp)
+        SELECT m.symbol_id, m.price, m.uniswap_liquidity, m.curve_liquidity, m.timestamp
+        FROM market_data m
+        JOIN (SELECT symbol_id, MAX(timestamp) AS timestamp FROM market_data GROUP BY symbol_id) newest
+          ON newest.symbol_id = m.symbol_id AND newest.timestamp = m.timestamp
+    """)
+
+
+# (version, name, apply). Append only: applied versions are recorded in schema_migrations and never re-run.
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "create market_data", create_market_data),
+    (2, "unique (symbol, timestamp)", add_symbol_timestamp_key),
+    (3, "symbols dimension table", create_symbols),
+    (4, "partition market_data by year", partition_market_data),
+    (5, "1m/1h/1d rollup tables", create_rollups),
+    (6, "market_latest snapshot table", create_market_latest),
+]
+
+
+def migrate():
+    """
+    Applies pending migrations in order. A MySQL named lock serialises concurrent app workers.
+    DDL commits implicitly, so each migration is written to be safe to re-run if interrupted.
+    """
+    with db.connection() as conn:
+        cur = conn.cursor(dictionary=True)
+        try:
+            cur.execute("SELECT GET_LOCK(%s, %s) AS locked", (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+            if not cur.fetchone()["locked"]:
+                raise TimeoutError("Timed out waiting for another process to finish migrating.")
+
+            try:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INT PRIMARY KEY,
+                        name VARCHAR(100) NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                cur.execute("SELECT version FROM schema_migrations")
+                applied = {row["version"] for row in cur.fetchall()}
+
+                for version, name, apply in MIGRATIONS:
+                    if version in applied:
+                        continue
+                    logger.info(f"Applying migration {version}: {name}")
+                    apply(cur)
+                    cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+                    conn.commit()
+            finally:
+                cur.execute("SELECT RELEASE_LOCK(%s) AS released", (MIGRATION_LOCK,))
+                cur.fetchall()
+        finally:
+            cur.close()
+
+    logger.info(f"Database schema is at version {MIGRATIONS[-1][0]}.")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    migrate()
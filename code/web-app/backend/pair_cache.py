@@ -0,0 +1,133 @@
+import os
+import time
+import atexit
+import asyncio
+import sqlite3
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from registry import UNISWAP_V2_ABI
+
+logger = logging.getLogger(__name__)
+
+PAIR_CACHE_PATH = os.getenv("PAIR_CACHE_PATH", "pair_cache.sqlite3")
+# A pair that doesn't exist yet can be created later, so "no pair" answers expire; real pairs never do
+PAIR_NEGATIVE_TTL_SECONDS = float(os.getenv("PAIR_NEGATIVE_TTL_SECONDS", "86400"))
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+Key = Tuple[str, str, str]
+
+
+def pair_key(factory: str, tokenA: str, tokenB: str) -> Key:
+    """(factory, token0, token1) with the tokens sorted by address, so A/B and B/A share an entry."""
+    token0, token1 = sorted((tokenA, tokenB), key=lambda address: int(address, 16))
+    return factory, token0, token1
+
+
+class PairCache:
+    """
+    Persistent (factory, token0, token1) -> pair address map in SQLite, including negative entries
+    for pairs that don't exist. The whole table is loaded into memory when opened, so lookups
+    never touch disk and only misses (or expired negatives) cost a getPair call. New answers are
+    written back in batches off the event loop, so a burst of misses costs one commit, not one each.
+    """
+
+    def __init__(self, path: str = PAIR_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()  # guards _entries/_pending
+        self._write_lock = threading.Lock()  # serialises use of the SQLite connection
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")  # job worker processes share the file
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS pairs (
+                factory TEXT NOT NULL,
+                token0 TEXT NOT NULL,
+                token1 TEXT NOT NULL,
+                pair TEXT,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (factory, token0, token1)
+            )
+        """)
+        self._conn.commit()
+        self._entries: Dict[Key, Tuple[Optional[str], float]] = {}
+        self._pending: List[Tuple] = []
+        self._flushing: Optional[asyncio.Future] = None
+        self.warm()
+
+    def warm(self):
+        """(Re)loads every stored entry into memory."""
+        with self._write_lock:
+            rows = self._conn.execute("SELECT factory, token0, token1, pair, checked_at FROM pairs").fetchall()
+        entries = {(factory, token0, token1): (pair, checked_at) for factory, token0, token1, pair, checked_at in rows}
+        with self._lock:
+            self._entries = entries
+        logger.info(f"Pair cache warmed with {len(self._entries)} entries from {self.path}")
+
+    def get(self, key: Key) -> Tuple[bool, Optional[str]]:
+        """(hit, address); address is None for a cached "no such pair"."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        pair, checked_at = entry
+        if pair is None and time.time() - checked_at > PAIR_NEGATIVE_TTL_SECONDS:
+            return False, None
+        return True, pair
+
+    def put(self, key: Key, pair: Optional[str]):
+        """Caches an answer in memory at once; it reaches disk on the next `flush`."""
+        checked_at = time.time()
+        with self._lock:
+            self._entries[key] = (pair, checked_at)
+            self._pending.append((*key, pair, checked_at))
+
+    def flush(self):
+        """Writes every pending answer in one transaction (blocking; see `_flush_soon` on the event loop)."""
+        with self._write_lock:
+            # Only the swap holds `_lock`, so put() on the event loop never waits on disk I/O
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if pending:
+                self._conn.executemany("INSERT OR REPLACE INTO pairs VALUES (?, ?, ?, ?, ?)", pending)
+                self._conn.commit()
+
+    def _flush_soon(self):
+        # One executor write at a time; misses arriving meanwhile are picked up by the next one
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.get_running_loop().run_in_executor(None, self.flush)
+            self._flushing.add_done_callback(self._flushed)
+
+    def _flushed(self, future: asyncio.Future):
+        if future.exception() is not None:
+            logger.error(f"Failed to write pair cache {self.path}: {future.exception()}")
+        elif self._pending:
+            self._flush_soon()
+
+    async def get_pair(self, web3, factory: str, tokenA: str, tokenB: str) -> Optional[str]:
+        """Pair address for tokenA/tokenB on a Uniswap V2 style factory, or None if there is no pool."""
+        key = pair_key(factory, tokenA, tokenB)
+        hit, pair = self.get(key)
+        if hit:
+            return pair
+
+        factory_contract = web3.eth.contract(address=factory, abi=UNISWAP_V2_ABI)
+        pair = await factory_contract.functions.getPair(key[1], key[2]).call()
+        pair = None if pair == ZERO_ADDRESS else pair
+        self.put(key, pair)
+        self._flush_soon()
+        return pair
+
+
+_cache = None
+
+
+def cache() -> PairCache:
+    global _cache
+    if _cache is None:
+        _cache = PairCache()
+        atexit.register(_cache.flush)
+    return _cache
+
+
+async def get_pair(web3, factory: str, tokenA: str, tokenB: str) -> Optional[str]:
+    return await cache().get_pair(web3, factory, tokenA, tokenB)
@@ -0,0 +1,35 @@
+import numpy as np
+from typing import Dict, List, Sequence
+
+
+def forward_fill(matrix: np.ndarray) -> np.ndarray:
+    """Fills each NaN with the last non-NaN value above it in the same column (leading NaNs stay NaN)."""
+    rows = np.arange(matrix.shape[0])[:, None]
+    last_valid = np.where(~np.isnan(matrix), rows, 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    return matrix[last_valid, np.arange(matrix.shape[1])]
+
+
+def build_price_matrix(rows: Sequence[Dict], symbols: List[str], value_key: str = "price") -> Dict[str, List]:
+    """
+    Pivots long (symbol, timestamp, price) rows into time-aligned columns: one `timestamp`
+    column (unix seconds, ascending) plus one column per symbol, forward-filled over gaps.
+    Missing values before a symbol's first observation are None.
+    """
+    if not rows:
+        return {"timestamp": [], **{symbol: [] for symbol in symbols}}
+
+    column_of = {symbol: i for i, symbol in enumerate(symbols)}
+    timestamps = np.array([row["timestamp"] for row in rows], dtype="datetime64[s]").astype(np.int64)
+    columns = np.array([column_of[row["symbol"]] for row in rows])
+    values = np.array([row[value_key] for row in rows], dtype=np.float64)
+
+    times, time_index = np.unique(timestamps, return_inverse=True)
+    matrix = np.full((len(times), len(symbols)), np.nan)
+    matrix[time_index, columns] = values
+    matrix = forward_fill(matrix)
+
+    result = {"timestamp": times.tolist()}
+    for symbol, column in zip(symbols, matrix.T):
+        result[symbol] = np.where(np.isnan(column), None, column).tolist()
+    return result
@@ -0,0 +1,236 @@
+import os
+import csv
+import json
+import argparse
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+META_FILE = "meta.json"
+TIMESTAMP_FILE = "timestamp.i64"
+INITIAL_CAPACITY = 1024
+
+
+class PriceStore:
+    """
+    Columnar on-disk price store: a shared int64 unix-second timestamp index (strictly ascending)
+    plus one float64 column per symbol, NaN where a symbol has no price. Every file is a raw array
+    opened with np.memmap, so readers get zero-copy views of years of prices without MySQL.
+    Files are preallocated to `capacity` rows and grown geometrically; meta.json records the
+    committed length and is only rewritten after the data it covers is flushed.
+    """
+
+    def __init__(self, path: str, mode: str = "r"):
+        if mode not in ("r", "r+"):
+            raise ValueError("mode must be 'r' (read-only) or 'r+' (append)")
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.length: int = meta["length"]
+        self.capacity: int = meta["capacity"]
+        self.symbols: List[str] = meta["symbols"]
+        self._timestamps = self._open(TIMESTAMP_FILE, np.int64)
+        self._columns = {symbol: self._open(self._column_file(symbol), np.float64) for symbol in self.symbols}
+
+    @classmethod
+    def create(cls, path: str, symbols: Sequence[str] = (), capacity: int = INITIAL_CAPACITY) -> "PriceStore":
+        """Creates an empty store (the directory may exist but must not already hold one)."""
+        os.makedirs(path, exist_ok=True)
+        if os.path.exists(os.path.join(path, META_FILE)):
+            raise FileExistsError(f"A price store already exists at {path}")
+
+        for name in [TIMESTAMP_FILE] + [cls._column_file(symbol) for symbol in symbols]:
+            with open(os.path.join(path, name), "wb") as f:
+                f.truncate(capacity * 8)
+        cls._write_meta(path, 0, capacity, list(symbols))
+        return cls(path, mode="r+")
+
+    @staticmethod
+    def _column_file(symbol: str) -> str:
+        return f"{symbol}.f64"
+
+    @staticmethod
+    def _write_meta(path: str, length: int, capacity: int, symbols: List[str]):
+        tmp = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "length": length, "capacity": capacity, "symbols": symbols}, f)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+    def _open(self, name: str, dtype) -> np.memmap:
+        return np.memmap(os.path.join(self.path, name), dtype=dtype, mode=self.mode, shape=(self.capacity,))
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self.length]
+
+    def prices(self, symbol: str) -> np.ndarray:
+        return self._columns[symbol][:self.length]
+
+    def frame(self, symbols: Optional[Sequence[str]] = None, start: Optional[int] = None,
+              end: Optional[int] = None) -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+        """Timestamps in [start, end) and the matching price views, located by binary search."""
+        timestamps = self.timestamps
+        lo = np.searchsorted(timestamps, start, "left") if start is not None else 0
+        hi = np.searchsorted(timestamps, end, "left") if end is not None else self.length
+        return timestamps[lo:hi], {symbol: self.prices(symbol)[lo:hi] for symbol in (symbols or self.symbols)}
+
+    def _grow(self, needed: int):
+        capacity = max(needed, self.capacity * 2)
+        for name in [TIMESTAMP_FILE] + [self._column_file(symbol) for symbol in self.symbols]:
+            with open(os.path.join(self.path, name), "r+b") as f:
+                f.truncate(capacity * 8)
+        self.capacity = capacity
+        self._timestamps = self._open(TIMESTAMP_FILE, np.int64)
+        self._columns = {symbol: self._open(self._column_file(symbol), np.float64) for symbol in self.symbols}
+
+    def _add_symbol(self, symbol: str):
+        with open(os.path.join(self.path, self._column_file(symbol)), "wb") as f:
+            f.truncate(self.capacity * 8)
+        self.symbols.append(symbol)
+        self._columns[symbol] = self._open(self._column_file(symbol), np.float64)
+        self._columns[symbol][:self.length] = np.nan
+
+    def append(self, timestamps: Sequence[int], columns: Dict[str, Sequence[float]]):
+        """
+        Appends rows at strictly ascending `timestamps` (unix seconds). Symbols missing from `columns`
+        get NaN; unknown symbols become new columns. A first timestamp equal to the last stored one
+        merges into that row (non-NaN values win), so chunked imports can split a timestamp.
+        """
+        if self.mode != "r+":
+            raise PermissionError("Price store is open read-only")
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return
+        if np.any(np.diff(timestamps) <= 0):
+            raise ValueError("Timestamps must be strictly ascending")
+
+        for symbol in columns:
+            if symbol not in self._columns:
+                self._add_symbol(symbol)
+
+        if self.length and timestamps[0] == self._timestamps[self.length - 1]:
+            last = self.length - 1
+            for symbol, values in columns.items():
+                if not np.isnan(values[0]):
+                    self._columns[symbol][last] = values[0]
+            timestamps = timestamps[1:]
+            columns = {symbol: np.asarray(values)[1:] for symbol, values in columns.items()}
+        elif self.length and timestamps[0] < self._timestamps[self.length - 1]:
+            raise ValueError("Appended timestamps must not precede the stored ones")
+
+        start, end = self.length, self.length + len(timestamps)
+        if end > self.capacity:
+            self._grow(end)
+
+        self._timestamps[start:end] = timestamps
+        for symbol in self.symbols:
+            self._columns[symbol][start:end] = columns[symbol] if symbol in columns else np.nan
+        self.flush(end)
+
+    def flush(self, length: Optional[int] = None):
+        """Flushes the mapped files, then commits `length` (and the symbol list) to meta.json."""
+        self._timestamps.flush()
+        for column in self._columns.values():
+            column.flush()
+        if length is not None:
+            self.length = length
+        self._write_meta(self.path, self.length, self.capacity, self.symbols)
+
+
+def _pivot(rows: Sequence[Dict], value_key: str = "price") -> Tuple[np.ndarray, Dict[str, np.ndarray]]:
+    """Long (symbol, timestamp, price) rows -> ascending unique timestamps and one NaN-padded column per symbol."""
+    timestamps = np.array([row["timestamp"] for row in rows], dtype="datetime64[s]").astype(np.int64)
+    times, time_index = np.unique(timestamps, return_inverse=True)
+    columns: Dict[str, np.ndarray] = {}
+    for i, row in enumerate(rows):
+        column = columns.get(row["symbol"])
+        if column is None:
+            column = columns[row["symbol"]] = np.full(len(times), np.nan)
+        column[time_index[i]] = float(row[value_key])
+    return times, columns
+
+
+def import_csv(csv_path: str, store_path: str) -> PriceStore:
+    """
+    Converts a wide `date,BTCUSDT,...` CSV (newest first, like historical_data.csv) into a store,
+    sorted ascending. Empty and zero cells mean "no price" and become NaN.
+    """
+    with open(csv_path, "r", newline="") as file:
+        reader = csv.reader(file)
+        symbols = next(reader)[1:]
+        dates, values = [], []
+        for row in reader:
+            dates.append(datetime.fromisoformat(row[0]))
+            values.append([float(cell) if cell else np.nan for cell in row[1:]])
+
+    timestamps = np.array(dates, dtype="datetime64[s]").astype(np.int64)
+    matrix = np.array(values, dtype=np.float64).reshape(len(dates), len(symbols))
+    matrix[matrix == 0] = np.nan
+    order = np.argsort(timestamps, kind="stable")
+    timestamps, matrix = timestamps[order], matrix[order]
+
+    # The same day can appear twice (e.g. `2017-09-01` and `2017-09-01 00:00:00`): merge, ignoring NaN
+    times, starts = np.unique(timestamps, return_index=True)
+    matrix = np.fmax.reduceat(matrix, starts, axis=0)
+
+    store = PriceStore.create(store_path, symbols, capacity=max(len(times), INITIAL_CAPACITY))
+    store.append(times, {symbol: matrix[:, i] for i, symbol in enumerate(symbols)})
+    logger.info(f"Imported {len(times)} rows x {len(symbols)} symbols from {csv_path} into {store_path}")
+    return store
+
+
+def import_market_data(store_path: str, symbols: Optional[List[str]] = None,
+                       start: Optional[datetime] = None, end: Optional[datetime] = None) -> PriceStore:
+    """
+    Streams market_data rows (oldest first) into a store, creating it or appending past its last
+    timestamp. Rows are pivoted one DB_STREAM_CHUNK at a time, so memory stays flat.
+    """
+    # Imported here so the store itself can be used without the MySQL driver installed
+    import db
+    from history_queries import HistoryQuery, build_history_sql
+
+    if os.path.exists(os.path.join(store_path, META_FILE)):
+        store = PriceStore(store_path, mode="r+")
+        if len(store) and start is None:
+            start = datetime.fromtimestamp(int(store.timestamps[-1]), tz=timezone.utc).replace(tzinfo=None)
+    else:
+        store = PriceStore.create(store_path, symbols or [])
+
+    imported = 0
+    for chunk in db.stream_rows(*build_history_sql(symbols, HistoryQuery(start, end, None, None))):
+        timestamps, columns = _pivot(chunk)
+        store.append(timestamps, columns)
+        imported += len(chunk)
+    logger.info(f"Imported {imported} market_data rows into {store_path} ({len(store)} timestamps)")
+    return store
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Build a memory-mapped columnar price store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    from_csv = commands.add_parser("import-csv", help="convert a wide price CSV")
+    from_csv.add_argument("csv")
+    from_csv.add_argument("store")
+
+    from_db = commands.add_parser("import-db", help="copy (or incrementally append) market_data")
+    from_db.add_argument("store")
+    from_db.add_argument("--symbols", help="comma separated, e.g. BTCUSDT,ETHUSDT (default: all)")
+    args = parser.parse_args()
+
+    if args.command == "import-csv":
+        import_csv(args.csv, args.store)
+    else:
+        import_market_data(args.store, args.symbols.split(",") if args.symbols else None)
+
+
+if __name__ == "__main__":
+    main()
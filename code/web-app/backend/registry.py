@@ -0,0 +1,184 @@
+# Single source of truth for the tokens, FTSO feeds and contract ABIs used across the backend.
+# Everything derived from them (checksummed addresses, bytes21 feed ids, ABI-encoded calldata)
+# is computed once at import, so the hot price loop never re-encodes or re-checksums anything.
+import json
+from functools import lru_cache
+from typing import List, Sequence, Tuple, Union
+from web3 import Web3
+
+# FtsoV2 address (Flare Testnet Coston2)
+FTSOV2_ADDRESS = Web3.to_checksum_address("0x3d893C53D9e8056135C26C8c638B76C8b60Df726")
+FLARE_RPC_URL = "https://coston2-api.flare.network/ext/C/rpc"
+UNISWAP_V2_FACTORY = Web3.to_checksum_address("0x5C69bEe701ef814a2B6a3EDD4B1652CB9cc5aA6f")  # Uniswap V2 Factory (getPair)
+
+# Feed IDs for Flare FTSO
+FEED_IDS = {
+    "AAVE": "0x01414156452f555344000000000000000000000000",
+    "ADA": "0x014144412f55534400000000000000000000000000",
+    "ALGO": "0x01414c474f2f555344000000000000000000000000",
+    "APT": "0x014150542f55534400000000000000000000000000",
+    "ARB": "0x014152422f55534400000000000000000000000000",
+    "ATOM": "0x0141544f4d2f555344000000000000000000000000",
+    "AVAX": "0x01415641582f555344000000000000000000000000",
+    "BCH": "0x014243482f55534400000000000000000000000000",
+    "BNB": "0x01424e422f55534400000000000000000000000000",
+    "BTC": "0x014254432f55534400000000000000000000000000",
+    "DOGE": "0x01444f47452f555344000000000000000000000000",
+    "DOT": "0x01444f542f55534400000000000000000000000000",
+    "ETC": "0x014554432f55534400000000000000000000000000",
+    "ETH": "0x014554482f55534400000000000000000000000000",
+    "FIL": "0x0146494c2f55534400000000000000000000000000",
+    "FLR": "0x01464c522f55534400000000000000000000000000",
+    "FTM": "0x0146544d2f55534400000000000000000000000000",
+    "HBAR": "0x01484241522f555344000000000000000000000000",
+    "ICP": "0x014943502f55534400000000000000000000000000",
+    "LINK": "0x014c494e4b2f555344000000000000000000000000",
+    "LTC": "0x014c54432f55534400000000000000000000000000",
+    "NEAR": "0x014e4541522f555344000000000000000000000000",
+    "QNT": "0x01514e542f55534400000000000000000000000000",
+    "SHIB": "0x01534849422f555344000000000000000000000000",
+    "SOL": "0x01534f4c2f55534400000000000000000000000000",
+    "UNI": "0x01554e492f55534400000000000000000000000000",
+    "USDC": "0x01555344432f555344000000000000000000000000",
+    "USDT": "0x01555344542f555344000000000000000000000000",
+    "XLM": "0x01584c4d2f55534400000000000000000000000000",
+    "XRP": "0x015852502f55534400000000000000000000000000",
+}
+
+_TOKEN_ADDRESSES = {
+    "AAVE": "0x7Fc66500c84A76Ad7e9c93437bFc5Ac33E2DDaE9",
+    "ADA": "0x3ee2200efb3400fabb9aacf31297cbdd1d435d47",
+    "ALGO": "0xf4E3fe15fe13Ee5A6EeB67F18d7A30Fb863Ce20f",
+    "APT": "0x00312B3D7f39F63b15D5B2078F2862249B09338D",
+    "ARB": "0x912CE59144191C1204E64559FE8253a0e49E6548",
+    "ATOM": "0x0eb3a705fc54725037cc9e008bdede697f62f335",
+    "AVAX": "0x1ce0c2827e2ef14d5c4f29a091d735a204794041",
+    "BCH": "0x8ff795a6f4d97e7887c79bea79aba5cc76444adf",
+    "BNB": "0xb8c77482e45f1f44de1745f52c74426c631bdd52",
+    "BTC": "0x7130d2a12b9bcbfae4f2634d864a1ee1ce3ead9c",
+    "DOGE": "0xba2ae424d960c26247dd6c32edc70b295c744c43",
+    "DOT": "0x7083609fce4d1d8dc0c979aab8c869ea2c873402",
+    "ETC": "0xdD2799Fc98C010D967ba0a95A1fe6DaB8C08cb97",
+    "ETH": "0x2170ed0880ac9a755fd29b2688956bd959f933f8",
+    "FIL": "0x0d8ce2a99bb6e3b7db580ed848240e4a0f9ae153",
+    "FLR": "0xc1b23c67dffb267956736dbea4b3962fed05763a",
+    "FTM": "0xad29abb318791d579433d831ed122afeaf29dcfe",
+    "HBAR": "0xa43C7F27E36279645Bd1620070414e564ec291a9",
+    "ICP": "0xc807acd80861edd471115d505f1d7f3bb1808969",
+    "LINK": "0x514910771AF9Ca656af840dff83E8264EcF986CA",
+    "LTC": "0x4338665cbb7b2485a8855a139b75d5e34ab0db94",
+    "NEAR": "0x85f17cf997934a597031b2e18a9ab6ebd4b9f6a4",
+    "QNT": "0x4a220e6096b25eadb88358cb44068a3248254675",
+    "SHIB": "0x95aD61b0a150d79219dCF64E1E6Cc01f0B64C4cE",
+    "SOL": "0x1f54638b7737193ffd86c19ec51907a7c41755d8",
+    "UNI": "0x1f9840a85d5af5bf1d1762f925bdaddc4201f984",
+    "USDC": "0xa0b86991c6218b36c1d19d4a2e9eb0ce3606eb48",
+    "USDT": "0xdac17f958d2ee523a2206206994597c13d831ec7",
+    "XLM": "0xba5fe23f8a3a24bed3236f05f2fcf35fd0bf0b5c",
+    "XRP": "0x1d2f0da169ceb9fc7b3144628db156f3f6c60dbe",
+}
+
+# Checksummed once here instead of in every module that needs them
+TOKEN_ADDRESSES = {symbol: Web3.to_checksum_address(address) for symbol, address in _TOKEN_ADDRESSES.items()}
+
+# Multicall3 is deployed at the same address on every EVM chain (including Flare/Coston2)
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MULTICALL3_ABI = json.loads('''[
+    {"inputs":[{"components":[
+        {"internalType":"address","name":"target","type":"address"},
+        {"internalType":"bool","name":"allowFailure","type":"bool"},
+        {"internalType":"bytes","name":"callData","type":"bytes"}
+    ],"internalType":"struct Multicall3.Call3[]","name":"calls","type":"tuple[]"}],"name":"aggregate3","outputs":[{"components":[
+        {"internalType":"bool","name":"success","type":"bool"},
+        {"internalType":"bytes","name":"returnData","type":"bytes"}
+    ],"internalType":"struct Multicall3.Result[]","name":"returnData","type":"tuple[]"}],"stateMutability":"payable","type":"function"}
+]''')
+
+# Uniswap V2 ABIs
+# getPair(tokenA, tokenB) is a factory function; the router does not implement it
+UNISWAP_V2_ABI = json.loads('[{"constant":true,"inputs":[{"internalType":"address","name":"tokenA","type":"address"},{"internalType":"address","name":"tokenB","type":"address"}],"name":"getPair","outputs":[{"internalType":"address","name":"pair","type":"address"}],"payable":false,"stateMutability":"view","type":"function"}]')
+
+UNISWAP_V2_PAIR_ABI = json.loads('[{"constant":true,"inputs":[],"name":"getReserves","outputs":[{"internalType":"uint112","name":"reserve0","type":"uint112"},{"internalType":"uint112","name":"reserve1","type":"uint112"},{"internalType":"uint32","name":"blockTimestampLast","type":"uint32"}],"payable":false,"stateMutability":"view","type":"function"}]')
+
+# --- Precomputed calldata ---
+
+GET_FEED_BY_ID_SELECTOR = Web3.keccak(text="getFeedById(bytes21)")[:4]
+GET_FEEDS_BY_ID_SELECTOR = Web3.keccak(text="getFeedsById(bytes21[])")[:4]
+
+# bytes21 is ABI-encoded left-aligned in a 32 byte word
+GET_FEED_BY_ID_CALLDATA = {
+    feed_id: GET_FEED_BY_ID_SELECTOR + bytes.fromhex(feed_id[2:]).ljust(32, b"\0")
+    for feed_id in FEED_IDS.values()
+}
+
+
+def _word(value: int) -> bytes:
+    return value.to_bytes(32, "big")
+
+
+@lru_cache(maxsize=256)
+def get_feeds_by_id_calldata(feed_ids: Tuple[str, ...]) -> bytes:
+    """ABI-encoded `getFeedsById(bytes21[])` calldata; cached since the same feed sets are read every epoch."""
+    encoded = [bytes.fromhex(feed_id[2:]).ljust(32, b"\0") for feed_id in feed_ids]
+    return GET_FEEDS_BY_ID_SELECTOR + _word(32) + _word(len(encoded)) + b"".join(encoded)
+
+
+def decode_feed(raw: bytes) -> Tuple[int, int, int]:
+    """Decodes `getFeedById` return data into (value, decimals, timestamp)."""
+    return (
+        int.from_bytes(raw[0:32], "big"),
+        int.from_bytes(raw[32:64], "big", signed=True),
+        int.from_bytes(raw[64:96], "big"),
+    )
+
+
+def decode_feeds(raw: bytes) -> List[Tuple[int, int, int]]:
+    """
+    Decodes `getFeedsById` return data into one (value, decimals, timestamp) per feed.
+    Raises ValueError if the data is too short for the offsets and count it declares.
+    """
+    if len(raw) < 96:
+        raise ValueError(f"getFeedsById returned {len(raw)} bytes (wrong address or chain?)")
+    values_offset = int.from_bytes(raw[0:32], "big")
+    decimals_offset = int.from_bytes(raw[32:64], "big")
+    timestamp = int.from_bytes(raw[64:96], "big")
+    if max(values_offset, decimals_offset) + 32 > len(raw):
+        raise ValueError("getFeedsById return data has an array offset past its end")
+
+    count = int.from_bytes(raw[values_offset:values_offset + 32], "big")
+    if max(values_offset, decimals_offset) + 32 * (count + 1) > len(raw):
+        raise ValueError(f"getFeedsById return data is too short for {count} feeds")
+    feeds = []
+    for i in range(count):
+        value_at = values_offset + 32 * (i + 1)
+        decimals_at = decimals_offset + 32 * (i + 1)
+        feeds.append((
+            int.from_bytes(raw[value_at:value_at + 32], "big"),
+            int.from_bytes(raw[decimals_at:decimals_at + 32], "big", signed=True),
+            timestamp,
+        ))
+    return feeds
+
+
+async def eth_call_raw(w3, to: str, data: bytes, block: Union[str, int] = "latest") -> bytes:
+    """
+    Sends a bare `eth_call` through the provider, skipping web3's contract-function
+    encoding, middleware and result formatting. Returns the raw return data.
+    """
+    block_id = hex(block) if isinstance(block, int) else block
+    response = await w3.provider.make_request("eth_call", [{"to": to, "data": "0x" + data.hex()}, block_id])
+    if "error" in response:
+        raise ValueError(response["error"])
+    return bytes.fromhex(response["result"][2:])
+
+
+async def read_feeds_raw(w3, feed_ids: Sequence[str], block: Union[str, int] = "latest") -> List[Tuple[int, int, int]]:
+    """
+    Reads (value, decimals, timestamp) for every feed id with one raw `getFeedsById` eth_call.
+    Raises ValueError on empty, truncated or mismatched return data so callers can fall back.
+    """
+    raw = await eth_call_raw(w3, FTSOV2_ADDRESS, get_feeds_by_id_calldata(tuple(feed_ids)), block)
+    feeds = decode_feeds(raw)
+    if len(feeds) != len(feed_ids):
+        raise ValueError(f"getFeedsById returned {len(feeds)} feeds for {len(feed_ids)} ids")
+    return feeds
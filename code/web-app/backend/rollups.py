@@ -0,0 +1,91 @@
+import calendar
+from datetime import datetime
+from typing import Dict, List, Sequence, Tuple
+
+# OHLC rollups of market_data, finest first: name -> bucket width in seconds (table market_data_<name>)
+ROLLUPS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# Merges a batch's partial bucket into the stored one. Assignments run left to right and see earlier
+# updates, so open/close (and liquidity) are decided before first_ts/last_ts move.
+UPSERT_ROLLUP = """
+    INSERT INTO {table} (symbol_id, bucket, open, high, low, close, first_ts, last_ts, uniswap_liquidity, curve_liquidity)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        open = IF(VALUES(first_ts) <= first_ts, VALUES(open), open),
+        first_ts = LEAST(first_ts, VALUES(first_ts)),
+        high = GREATEST(high, VALUES(high)),
+        low = LEAST(low, VALUES(low)),
+        close = IF(VALUES(last_ts) >= last_ts, VALUES(close), close),
+        uniswap_liquidity = IF(VALUES(last_ts) >= last_ts, COALESCE(VALUES(uniswap_liquidity), uniswap_liquidity), uniswap_liquidity),
+        curve_liquidity = IF(VALUES(last_ts) >= last_ts, COALESCE(VALUES(curve_liquidity), curve_liquidity), curve_liquidity),
+        last_ts = GREATEST(last_ts, VALUES(last_ts))
+"""
+
+
+def table(name: str) -> str:
+    return f"market_data_{name}"
+
+
+def rollup_for(seconds: int) -> Tuple[str, int]:
+    """The coarsest rollup whose buckets evenly divide a `seconds`-wide resolution."""
+    usable = [(name, width) for name, width in ROLLUPS.items() if seconds % width == 0]
+    if not usable:
+        raise ValueError(f"No rollup fits a {seconds}s resolution.")
+    return usable[-1]
+
+
+def _epoch(timestamp: datetime) -> int:
+    return calendar.timegm(timestamp.timetuple())  # naive UTC, like the TIMESTAMP column
+
+
+def aggregate(rows: Sequence[Tuple], seconds: int) -> List[Tuple]:
+    """
+    Folds (symbol_id, price, uniswap_liquidity, curve_liquidity, timestamp) rows into one
+    UPSERT_ROLLUP parameter tuple per (symbol_id, bucket).
+    """
+    buckets: Dict[Tuple[int, int], list] = {}
+    for symbol_id, price, uniswap, curve, ts in rows:
+        key = (symbol_id, _epoch(ts) // seconds * seconds)
+        bucket = buckets.get(key)
+        if bucket is None:
+            buckets[key] = [price, price, price, price, ts, ts, uniswap, curve]
+            continue
+        if ts < bucket[4]:
+            bucket[0], bucket[4] = price, ts
+        bucket[1] = max(bucket[1], price)
+        bucket[2] = min(bucket[2], price)
+        if ts >= bucket[5]:
+            bucket[3], bucket[5] = price, ts
+            bucket[6] = uniswap if uniswap is not None else bucket[6]
+            bucket[7] = curve if curve is not None else bucket[7]
+    return [(symbol_id, bucket, *values) for (symbol_id, bucket), values in buckets.items()]
+
+
+def update_rollups(cur, rows: Sequence[Tuple]):
+    """
+    Folds a batch of freshly upserted market_data rows into every rollup table, in the caller's
+    transaction. Buckets only widen: a re-ingested row with a corrected price updates open/close
+    but cannot lower a high (or raise a low) it already set.
+    """
+    for name, seconds in ROLLUPS.items():
+        cur.executemany(UPSERT_ROLLUP.format(table=table(name)), aggregate(rows, seconds))
+
+
+def backfill_sql(name: str) -> str:
+    """Rebuilds one rollup table from market_data (used when the rollups are first created)."""
+    seconds = ROLLUPS[name]
+    return f"""
+        REPLACE INTO {table(name)} (symbol_id, bucket, open, high, low, close, first_ts, last_ts, uniswap_liquidity, curve_liquidity)
+        SELECT symbol_id,
+               UNIX_TIMESTAMP(timestamp) DIV {seconds} * {seconds} AS period,
+               CAST(SUBSTRING_INDEX(GROUP_CONCAT(price ORDER BY timestamp ASC), ',', 1) AS DECIMAL(18,8)),
+               MAX(price),
+               MIN(price),
+               CAST(SUBSTRING_INDEX(GROUP_CONCAT(price ORDER BY timestamp DESC), ',', 1) AS DECIMAL(18,8)),
+               MIN(timestamp),
+               MAX(timestamp),
+               CAST(SUBSTRING_INDEX(GROUP_CONCAT(uniswap_liquidity ORDER BY timestamp DESC), ',', 1) AS DECIMAL(30,8)),
+               CAST(SUBSTRING_INDEX(GROUP_CONCAT(curve_liquidity ORDER BY timestamp DESC), ',', 1) AS DECIMAL(30,8))
+        FROM market_data
+        GROUP BY symbol_id, period
+    """
@@ -0,0 +1,107 @@
+import os
+import gzip
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Any, Dict
+from web3 import AsyncHTTPProvider
+import web3_pool
+
+logger = logging.getLogger(__name__)
+
+# live: talk to the real endpoints; record: do that and save every response; replay: serve saved responses only
+RPC_TRANSPORT = os.getenv("RPC_TRANSPORT", "live")
+RPC_FIXTURE = os.getenv("RPC_FIXTURE", "rpc_fixture.jsonl.gz")
+RPC_REPLAY_LATENCY_MS = float(os.getenv("RPC_REPLAY_LATENCY_MS", "0"))
+
+
+class ReplayMissError(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+def request_key(*parts: Any) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FixtureStore:
+    """
+    Request/response pairs in a gzip'd JSON-lines file. Each recorded response is appended as
+    its own gzip member, so a recording that is interrupted still leaves a readable fixture.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._responses: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+        if os.path.exists(path):
+            with gzip.open(path, "rt") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self._responses[entry["key"]] = entry["response"]
+            logger.info(f"Loaded {len(self._responses)} recorded responses from {path}")
+
+    def get(self, key: str) -> Any:
+        if key not in self._responses:
+            raise ReplayMissError(f"No recorded response for request {key} in {self.path}")
+        return self._responses[key]
+
+    def put(self, key: str, request: Any, response: Any):
+        with self._lock:
+            self._responses[key] = response
+            with gzip.open(self.path, "at") as f:
+                f.write(json.dumps({"key": key, "request": request, "response": response}, default=str) + "\n")
+
+
+_store = None
+
+
+def store() -> FixtureStore:
+    global _store
+    if _store is None:
+        _store = FixtureStore(RPC_FIXTURE)
+    return _store
+
+
+async def _replay(key: str) -> Any:
+    if RPC_REPLAY_LATENCY_MS:
+        await asyncio.sleep(RPC_REPLAY_LATENCY_MS / 1000)
+    return store().get(key)
+
+
+class RecordReplayProvider(AsyncHTTPProvider):
+    """AsyncHTTPProvider that records JSON-RPC responses to, or replays them from, the fixture store."""
+
+    async def make_request(self, method, params):
+        key = request_key("rpc", self.endpoint_uri, method, params)
+        if RPC_TRANSPORT == "replay":
+            return await _replay(key)
+
+        response = await super().make_request(method, params)
+        store().put(key, [self.endpoint_uri, method, params], dict(response))
+        return response
+
+
+def make_provider(url: str) -> AsyncHTTPProvider:
+    """Provider for `url` according to RPC_TRANSPORT."""
+    if RPC_TRANSPORT in ("record", "replay"):
+        return RecordReplayProvider(url)
+    return AsyncHTTPProvider(url)
+
+
+async def get_json(url: str) -> Any:
+    """GETs a JSON document over the shared keep-alive session, honouring record/replay mode."""
+    key = request_key("http", "GET", url)
+    if RPC_TRANSPORT == "replay":
+        return await _replay(key)
+
+    session = await web3_pool.session()
+    async with session.get(url) as response:
+        response.raise_for_status()
+        data = await response.json(content_type=None)
+
+    if RPC_TRANSPORT == "record":
+        store().put(key, ["GET", url], data)
+    return data
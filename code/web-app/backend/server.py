@@ -0,0 +1,12 @@
+"""
+Backend entry point (`python server.py`).
+
+QAOA jobs run in spawned worker processes, and spawn re-imports the main module in every worker
+(and in the multiprocessing manager). Importing `app` only under the main guard keeps those
+processes from loading Flask, the FTSO poller and the ingest writer they never use.
+"""
+
+if __name__ == "__main__":
+    import app
+
+    app.run()
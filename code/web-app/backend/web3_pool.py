@@ -0,0 +1,138 @@
+import os
+import ssl
+import atexit
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Dict, Optional
+import aiohttp
+import certifi
+from web3 import AsyncWeb3
+from concurrency import RPC_TIMEOUT
+import rpc_transport
+
+logger = logging.getLogger(__name__)
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "64"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "30"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("WEB3_HEALTH_CHECK_INTERVAL", "30"))
+
+
+class Web3ClientPool:
+    """
+    Long-lived AsyncWeb3 clients, one per RPC endpoint, all sharing a single keep-alive
+    aiohttp session. The pool owns a background event loop thread that every client lives on;
+    synchronous callers submit coroutines with `run()`.
+    Endpoint health is checked in the background instead of with `is_connected()` per request:
+    a failing endpoint's client is dropped so the next request rebuilds it, and if every endpoint
+    fails at once the shared session (and its possibly dead keep-alive sockets) is replaced too.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._clients: Dict[str, AsyncWeb3] = {}
+        self._health_task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="web3-pool", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """Runs a coroutine on the pool's event loop from synchronous code and returns its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def _check_loop(self):
+        if asyncio.get_running_loop() is not self._loop:
+            raise RuntimeError("Pooled clients must be used on the pool's event loop (submit with web3_pool.run).")
+
+    async def session(self) -> aiohttp.ClientSession:
+        """Returns the shared keep-alive HTTP session."""
+        self._check_loop()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_SIZE,
+                keepalive_timeout=HTTP_KEEPALIVE_SECONDS,
+                ttl_dns_cache=300,
+                ssl=ssl.create_default_context(cafile=certifi.where()),
+            )
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=RPC_TIMEOUT))
+        return self._session
+
+    async def get_web3(self, url: str) -> AsyncWeb3:
+        """Returns the shared client for `url`, creating it on first use."""
+        self._check_loop()
+        w3 = self._clients.get(url)
+        if w3 is None:
+            provider = rpc_transport.make_provider(url)
+            await provider.cache_async_session(await self.session())
+            w3 = AsyncWeb3(provider)
+            self._clients[url] = w3
+            logger.info(f"Created pooled Web3 client for {url}")
+
+            if self._health_task is None:
+                self._health_task = asyncio.ensure_future(self._health_loop())
+        return w3
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            clients = list(self._clients.items())
+            failed = []
+            for url, w3 in clients:
+                try:
+                    healthy = await asyncio.wait_for(w3.is_connected(), RPC_TIMEOUT)
+                except Exception:
+                    healthy = False
+                if not healthy:
+                    failed.append(url)
+
+            for url in failed:
+                logger.warning(f"Web3 endpoint {url} failed its health check; reconnecting on next use")
+                self._clients.pop(url, None)
+            if clients and len(failed) == len(clients):
+                await self._reset_session()
+
+    async def _reset_session(self):
+        """Swaps in a fresh session; clients still holding the old one are dropped and rebuilt on next use."""
+        session, self._session = self._session, None
+        self._clients.clear()
+        if session is not None and not session.closed:
+            await session.close()
+        logger.warning("Every Web3 endpoint failed its health check; recreated the shared HTTP session")
+
+    async def _aclose(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._clients.clear()
+
+    def close(self):
+        """Closes the shared session and stops the pool's event loop."""
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop is None:
+            return
+
+        asyncio.run_coroutine_threadsafe(self._aclose(), loop).result(RPC_TIMEOUT)
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join(RPC_TIMEOUT)
+        loop.close()
+
+
+pool = Web3ClientPool()
+atexit.register(pool.close)
+
+run = pool.run
+get_web3 = pool.get_web3
+session = pool.session
@@ -55,7 +55,8 @@ interface LiveDataGraphProps {
           throw new Error(`Failed to fetch live data: ${response.statusText}`);
         }
         const result = await response.json();
-        const extracted = extractJsonFromString(result.data);
+        // Older backends returned the script stdout as a string; newer ones return structured JSON
+        const extracted = typeof result.data === "string" ? extractJsonFromString(result.data) : result.data;
         const opportunities: ArbitrageOpportunity[] = transformLiveData(extracted);
         if (result.status === "success") {
           // Assuming result.data is an array of ArbitrageOpportunity objects: